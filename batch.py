@@ -0,0 +1,197 @@
+import random
+import time
+import numpy as np
+import streams
+from deck import decks_for
+from wintable import CLI_OUTS, CLI_WIN
+
+"""
+Vectorized simulator for the CLI rules.
+
+Every game of a batch lives in a row of a few NumPy arrays: the deck as an
+(N, 52k) shuffled shoe of k decks with a per-game cursor, the hands as
+(N, players, 4) card codes (-1 for an empty slot, kept sorted) and the pot
+as an (N, 52k) stack. The shoe is as big as the table needs, as in the
+engine; codes stay 0-51, so the copies of a card share one.
+All games advance together, one seat per step, so deal, draw, the E/H discard
+policies of Player and the win checks are array operations over the batch.
+Row r draws its randomness from the stream of game start + r (see
+streams.Batch), so a game plays out the same in whatever batch it runs.
+"""
+
+WIN = np.frombuffer(bytes(CLI_WIN), dtype=np.uint8).astype(bool)
+OUTS = np.array(CLI_OUTS, dtype=np.int32)
+SHIFTS = np.array([0, 4, 8, 12])
+
+
+def win_codes(ranks):
+    # packs (M, 4) sorted ranks into wintable codes
+    return (ranks.astype(np.int64) << SHIFTS).sum(axis=1)
+
+# policies get one random 64-bit word per row to make their choices from
+
+def easy_policy(ranks, words):
+    # Player.cpu_throw_card: any card
+    return (words & np.uint64(3)).astype(np.int64)
+
+def hard_policy(ranks, words):
+    # Player.cpu_throw_card_pro, condition by condition, on sorted ranks
+    r0, r1, r2, r3 = ranks[:, 0], ranks[:, 1], ranks[:, 2], ranks[:, 3]
+    last_two = 2 + (words & np.uint64(1)).astype(np.int64)
+    anywhere = (words >> np.uint64(8) & np.uint64(3)).astype(np.int64)
+    conditions = [
+        r0 == r1,
+        r2 == r3,
+        r1 == r2,
+        (r0 == r1 - 1) & (r2 != r3),
+        (r2 == r3 - 1) & (r0 != r1),
+        (r1 == r2 - 1) & (r0 != r1) & (r2 != r3),
+    ]
+    choices = [last_two, 0, 0, last_two, 0, 0]
+    return np.select(conditions, choices, default=anywhere)
+
+POLICIES = {'E': easy_policy, 'H': hard_policy}
+
+
+class BatchGame:
+    def __init__(self, n_games, seats=('E', 'H'), seed=None, start=0, decks=None):
+        players = len(seats)
+        decks = decks_for(players) if decks is None else decks
+        cards = 52 * decks
+        if 3 * players + 1 > cards:
+            raise ValueError(f'A {cards} card shoe cannot deal {players} players')
+        self.seats = [level.upper() for level in seats]
+        self.policies = [POLICIES[level] for level in self.seats]
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self.streams = streams.Batch(self.seed, start, n_games)
+        self.n_games = n_games
+        self.deck = (self.streams.permutations(np.arange(n_games), cards) % 52).astype(np.int8)
+        self.size = np.full(n_games, cards)
+        self.top = np.full(n_games, 3 * players)
+        self.hands = np.full((n_games, players, 4), -1, dtype=np.int8)
+        self.hands[:, :, :3] = np.sort(self.deck[:, :3 * players].reshape(n_games, players, 3), axis=2)
+        self.pot = np.full((n_games, cards), -1, dtype=np.int8)
+        self.pot_size = np.zeros(n_games, dtype=np.int64)
+        self.active = np.ones(n_games, dtype=bool)
+        self.winner = np.full(n_games, -1)
+        self.length = np.zeros(n_games, dtype=np.int64)
+        self.reshuffles = np.zeros(n_games, dtype=np.int64)
+        self.turn = 0
+
+    def recycle(self, rows):
+        # an empty deck takes the whole pot back, shuffled
+        for row in rows:
+            cards = self.pot[row, :self.pot_size[row]]
+            cards = cards[self.streams.permutations([row], len(cards))[0]]
+            self.deck[row, :len(cards)] = cards
+            self.size[row] = len(cards)
+            self.top[row] = 0
+            self.pot_size[row] = 0
+            self.reshuffles[row] += 1
+
+    def finish(self, rows, seat):
+        self.active[rows] = False
+        self.winner[rows] = seat
+        self.length[rows] = self.turn
+
+    def step(self):
+        seat = self.turn % len(self.seats)
+        rows = np.flatnonzero(self.active)
+        self.recycle(rows[self.top[rows] == self.size[rows]])
+
+        # draw and check the 4-card hand
+        hand = self.hands[rows, seat]
+        hand[:, 3] = self.deck[rows, self.top[rows]]
+        self.top[rows] += 1
+        hand.sort(axis=1)
+        won = WIN[win_codes(hand >> 2)]
+        self.hands[rows, seat] = hand
+        self.finish(rows[won], seat)
+        rows, hand = rows[~won], hand[~won]
+
+        # discard into the pot
+        slot = self.policies[seat](hand >> 2, self.streams.words(rows)[:, 0])
+        picked = np.arange(len(rows))
+        card = hand[picked, slot]
+        hand[picked, slot] = hand[:, 3]
+        hand[:, 3] = -1
+        hand[:, :3].sort(axis=1)
+        self.hands[rows, seat] = hand
+        self.pot[rows, self.pot_size[rows]] = card
+        self.pot_size[rows] += 1
+
+        # the other seats, in seat order, may claim the discard
+        rank = card >> 2
+        for other in range(len(self.seats)):
+            if other == seat or not len(rows):
+                continue
+            held = self.hands[rows, other, :3].astype(np.int64) >> 2
+            codes = held[:, 0] | held[:, 1] << 4 | held[:, 2] << 8
+            won = (OUTS[codes] >> rank & 1).astype(bool)
+            self.finish(rows[won], other)
+            rows, rank = rows[~won], rank[~won]
+        self.turn += 1
+
+    def run(self, max_turns=100000):
+        while self.active.any() and self.turn < max_turns:
+            self.step()
+        return self.winner
+
+
+def simulate(n_games, seats=('E', 'H'), seed=None, max_turns=100000, start=0, results=None, decks=None):
+    """Plays games start to start + n_games in lockstep and returns per-seat wins, game lengths and reshuffle counts.
+
+    Every game is also appended to results if it is a results.ResultsStore;
+    games cut off by max_turns are stored as draws.
+    """
+    started = time.perf_counter()
+    batch = BatchGame(n_games, seats, seed, start, decks)
+    winner = batch.run(max_turns)
+    finished = winner >= 0
+    if results is not None:
+        # a row's stream key is its game's seed
+        turns = np.where(finished, batch.length, batch.turn)
+        results.extend(batch.seats, batch.streams.keys, winner, turns, batch.reshuffles)
+    return {
+        'games': n_games,
+        'seats': batch.seats,
+        'wins': np.bincount(winner[finished], minlength=len(seats)).tolist(),
+        'unfinished': int((~finished).sum()),
+        'lengths': batch.length[finished],
+        'length_histogram': np.bincount(batch.length[finished]).tolist(),
+        'reshuffles': batch.reshuffles,
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def cross_check(n_games=20000, seats=('E', 'H'), seed=0, sigmas=4.0):
+    """Compares per-seat win rates and mean game length with engine.simulate.
+
+    Returns the largest deviation in standard errors; raises AssertionError above sigmas.
+    """
+    import engine
+    reference = engine.simulate(n_games, seats, seed)
+    result = simulate(n_games, seats, seed)
+    worst = 0.0
+    for seat in range(len(seats)):
+        p_ref = reference['wins'][seat] / n_games
+        p_new = result['wins'][seat] / n_games
+        error = np.sqrt((p_ref * (1 - p_ref) + p_new * (1 - p_new)) / n_games) or 1.0
+        worst = max(worst, abs(p_ref - p_new) / error)
+    ref_lengths = np.asarray(reference['lengths'])
+    error = np.sqrt((ref_lengths.var() + result['lengths'].var()) / n_games) or 1.0
+    worst = max(worst, abs(ref_lengths.mean() - result['lengths'].mean()) / error)
+    assert worst <= sigmas, f'batch simulator is {worst:.1f} standard errors away from the engine'
+    return worst
+
+
+if __name__ == '__main__':
+    import sys
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    seats = sys.argv[2].split(',') if len(sys.argv) > 2 else ['E', 'H']
+    result = simulate(n, seats)
+    for seat, level in enumerate(result['seats']):
+        print(f"seat {seat + 1} ({level}): {result['wins'][seat] / n:.1%}")
+    lengths = result['lengths']
+    print(f"turns: mean {lengths.mean():.1f}, median {np.median(lengths):.0f}, p99 {np.percentile(lengths, 99):.0f}")
+    print(f"{n / result['seconds']:.0f} games per second")
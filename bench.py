@@ -0,0 +1,371 @@
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import invariants
+import render
+from card import POOL
+from deck import Deck
+from engine import Engine
+from player import Player
+
+"""
+Benchmarks of the game's hot paths.
+
+Every benchmark is a setup function returning (run, ops): run() is timed
+and performs ops operations. Each one is timed in rounds of at least
+MIN_ROUND seconds and the best round counts, which is the figure least
+disturbed by whatever else the machine is doing. Results are saved as JSON
+and can be compared with a saved baseline; a benchmark whose time per
+operation grew by more than the threshold is a regression and makes the
+run exit with status 1.
+
+    python bench.py --save baseline.json
+    python bench.py --compare baseline.json --threshold 0.1
+
+--imports also checks that the headless rules (njuka_working) import within
+a time and memory budget in a fresh interpreter, without loading Qt.
+"""
+
+BASELINE_FILE = 'bench_baseline.json'
+THRESHOLD = 0.10
+ROUNDS = 5
+MIN_ROUND = 0.2
+GAME_SIZES = (*range(2, 11), 20, 50)
+IMPORT_MODULE = 'njuka_working'
+IMPORT_BUDGET_MS = 60
+IMPORT_BUDGET_KB = 8 * 1024
+IMPORT_FORBIDDEN = ('PyQt5',)
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def random_hands(n, size, seed=0):
+    rng = random.Random(seed)
+    return [rng.sample(POOL, size) for _ in range(n)]
+
+
+@benchmark('card_sort')
+def card_sort():
+    # sorted() of 4-card hands goes through Card.__lt__
+    hands = random_hands(1000, 4)
+    def run():
+        for hand in hands:
+            sorted(hand)
+    return run, len(hands)
+
+@benchmark('deck_create')
+def deck_create():
+    def run():
+        for _ in range(100):
+            Deck()
+    return run, 100
+
+@benchmark('deck_shuffle')
+def deck_shuffle():
+    deck = Deck()
+    rng = random.Random(0)
+    def run():
+        for _ in range(100):
+            deck.shuffle_deck(rng)
+    return run, 100
+
+@benchmark('deck_deal')
+def deck_deal():
+    # a fresh deck dealt to four players
+    def run():
+        for _ in range(100):
+            Deck().deal([Player(level='E') for _ in range(4)])
+    return run, 100
+
+@benchmark('player_draw')
+def player_draw():
+    # drawing the fourth card and checking the hand for a win
+    hands = random_hands(1000, 4, seed=1)
+    player = Player(level='E')
+    deck = Deck()
+    def run():
+        for hand in hands:
+            for card in hand[:3]:
+                player.give_hand(card)
+            deck.cards.appendleft(hand[3])
+            player.draw(deck)
+            player.get_hand().clear()
+    return run, len(hands)
+
+@benchmark('check_pot')
+def check_pot():
+    # the other players of a 4-seat table looking at a discard
+    rng = random.Random(2)
+    tables = []
+    for _ in range(250):
+        cards = rng.sample(POOL, 13)
+        players = [Player(level='E') for _ in range(4)]
+        for seat, player in enumerate(players):
+            for card in cards[3 * seat:3 * seat + 3]:
+                player.give_hand(card)
+        tables.append((players, cards[12]))
+    def run():
+        for players, card in tables:
+            players[0].check_pot(players, card)
+    return run, len(tables)
+
+@benchmark('gui_win_check')
+def gui_win_check():
+    from njuka_working import is_winning_combination
+    hands = random_hands(1000, 4, seed=3)
+    def run():
+        for hand in hands:
+            is_winning_combination(hand)
+    return run, len(hands)
+
+@benchmark('gui_any_player_win')
+def gui_any_player_win():
+    import njuka_working
+    rng = random.Random(4)
+    tables = []
+    for _ in range(250):
+        cards = rng.sample(POOL, 14)
+        players = [njuka_working.Player(f'p{seat}') for seat in range(4)]
+        for seat, player in enumerate(players):
+            player.hand = sorted(cards[3 * seat:3 * seat + 3])
+            player.update_outs()
+        players[0].hand.append(cards[12])
+        tables.append((players, [cards[13]]))
+    def run():
+        for players, pot in tables:
+            njuka_working.check_any_player_win(players, pot)
+    return run, len(tables)
+
+
+@benchmark('ledger_move')
+def ledger_move():
+    # booking a draw and a discard at a cheap invariant level
+    ledger = invariants.Ledger(4)
+    codes = [card.code for card in random_hands(1, 40, seed=5)[0]]
+    def run():
+        move = ledger.move
+        for code in codes:
+            move(code, invariants.DECK, 0)
+            move(code, 0, invariants.POT)
+        ledger.recycle()
+    return run, 2 * len(codes)
+
+
+def legacy_hand(cards, out):
+    # what Player.print_cards did before render, one print per row
+    card_lines = []
+    for card in cards:
+        card_str = f"""
+    +-------+
+    | {card.get_rank():<2}    |
+    |  {card.get_suit()}    |
+    |    {card.get_rank():>2} |
+    +-------+
+    """
+        card_lines.append(card_str.split('\n'))
+    rows = ['' for _ in range(len(card_lines[0]))]
+    print('Hand:\n', file=out)
+    for i in range(len(rows)):
+        for card in card_lines:
+            rows[i] += card[i] + '  '
+    for row in rows:
+        print(row, file=out)
+
+def spectator_frames(mode, tables=20, frames=50):
+    # frames of 20 tables' hands, one of which changes per frame
+    def setup():
+        hands = random_hands(tables, 4, seed=6)
+        changed = random_hands(frames, 4, seed=7)
+        def run():
+            out = io.StringIO()
+            renderer = render.Renderer(out, diff=mode == 'diff')
+            for i in range(frames):
+                for t in range(tables):
+                    hand = changed[i] if t == i % tables else hands[t]
+                    if mode == 'print':
+                        legacy_hand(hand, out)
+                    else:
+                        renderer.hand(hand, f'Table {t + 1}:')
+                renderer.flush()
+        return run, frames
+    return setup
+
+for _mode in ('print', 'buffered', 'diff'):
+    benchmark(f'render_{_mode}')(spectator_frames(_mode))
+
+
+def games(players):
+    # whole headless games, E and H seats alternating, seeds fixed, checked as simulations are
+    def setup():
+        levels = ['E' if seat % 2 else 'H' for seat in range(players)]
+        checks = invariants.default_level(invariants.OFF)
+        def run():
+            for seed in range(20):
+                game = Engine([Player(level=level) for level in levels], seed=seed, checks=checks)
+                game.deal()
+                game.play()
+        return run, 20
+    return setup
+
+for _players in GAME_SIZES:
+    benchmark(f'games_{_players}p')(games(_players))
+
+
+def measure(setup, rounds=ROUNDS, min_round=MIN_ROUND):
+    """Returns the best seconds per operation over rounds."""
+    run, ops = setup()
+    run()
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            run()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_round:
+            break
+        calls *= 2
+    best = elapsed
+    for _ in range(rounds - 1):
+        start = time.perf_counter()
+        for _ in range(calls):
+            run()
+        best = min(best, time.perf_counter() - start)
+    return best / (calls * ops)
+
+
+def run_all(names=None, rounds=ROUNDS, min_round=MIN_ROUND, out=sys.stdout):
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if names and not any(part in name for part in names):
+            continue
+        seconds = measure(setup, rounds, min_round)
+        results[name] = {'seconds_per_op': seconds, 'ops_per_second': 1 / seconds}
+        print(f'{name:<20} {seconds * 1e6:12.3f} us/op {1 / seconds:14.0f} ops/s', file=out)
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+
+
+IMPORT_PROBE = '''
+import json, os, resource, sys, time
+def rss():
+    # resident KiB now where /proc has it, else the peak (bytes on macOS, KiB elsewhere)
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak // 1024 if sys.platform == 'darwin' else peak
+before = rss()
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'rss': rss() - before, 'modules': sorted(sys.modules)}}))
+'''
+
+def import_cost(module=IMPORT_MODULE, runs=5):
+    """Imports module in fresh interpreters; returns the best time, the largest RSS growth in KiB and the modules loaded."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    best, rss, modules = None, 0, []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', IMPORT_PROBE.format(module=module)], cwd=here,
+                                capture_output=True, text=True, check=True).stdout
+        probe = json.loads(output)
+        best = probe['seconds'] if best is None else min(best, probe['seconds'])
+        rss = max(rss, probe['rss'])
+        modules = probe['modules']
+    return {'module': module, 'ms': best * 1000, 'rss_kb': rss, 'modules': modules}
+
+def import_problems(cost, budget_ms=IMPORT_BUDGET_MS, budget_kb=IMPORT_BUDGET_KB):
+    problems = []
+    if cost['ms'] > budget_ms:
+        problems.append(f"importing {cost['module']} took {cost['ms']:.1f}ms, over the {budget_ms}ms budget")
+    if cost['rss_kb'] > budget_kb:
+        problems.append(f"importing {cost['module']} grew RSS by {cost['rss_kb']}KiB, over the {budget_kb}KiB budget")
+    for name in IMPORT_FORBIDDEN:
+        if name in cost['modules']:
+            problems.append(f"importing {cost['module']} loaded {name}")
+    return problems
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """Returns (name, baseline seconds, seconds, ratio, regressed) for benchmarks in both runs."""
+    rows = []
+    for name, result in results['results'].items():
+        old = baseline['results'].get(name)
+        if old is None:
+            continue
+        ratio = result['seconds_per_op'] / old['seconds_per_op']
+        rows.append((name, old['seconds_per_op'], result['seconds_per_op'], ratio, ratio > 1 + threshold))
+    return rows
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+def save(results, path):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the hot paths of the game.')
+    parser.add_argument('names', nargs='*', help='only run benchmarks whose name contains one of these')
+    parser.add_argument('-o', '--output', help='write the results to this JSON file')
+    parser.add_argument('--save', metavar='BASELINE', nargs='?', const=BASELINE_FILE,
+                        help=f'save the results as a baseline (default {BASELINE_FILE})')
+    parser.add_argument('--compare', metavar='BASELINE', nargs='?', const=BASELINE_FILE,
+                        help='compare the results with a saved baseline')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='slowdown counted as a regression, as a fraction (default 0.10)')
+    parser.add_argument('--rounds', type=int, default=ROUNDS)
+    parser.add_argument('--min-round', type=float, default=MIN_ROUND, help='seconds per timed round')
+    parser.add_argument('--list', action='store_true', help='list the benchmarks and exit')
+    parser.add_argument('--imports', action='store_true', help='check the headless import budget as well')
+    args = parser.parse_args()
+    if args.list:
+        print('\n'.join(BENCHMARKS))
+        return 0
+
+    results = run_all(args.names, args.rounds, args.min_round)
+    regressions = 0
+    if args.imports:
+        cost = import_cost()
+        results['imports'] = {key: cost[key] for key in ('module', 'ms', 'rss_kb')}
+        print(f"import {cost['module']:<13} {cost['ms']:10.1f} ms {cost['rss_kb']:10} KiB "
+              f"(budget {IMPORT_BUDGET_MS}ms, {IMPORT_BUDGET_KB}KiB)")
+        for problem in import_problems(cost):
+            print(f'OVER BUDGET: {problem}')
+            regressions += 1
+    for path in (args.output, args.save):
+        if path:
+            save(results, path)
+    if not args.compare:
+        return 1 if regressions else 0
+    print(f'\ncompared with {args.compare} (threshold {args.threshold:.0%}):')
+    for name, old, new, ratio, regressed in compare(results, load(args.compare), args.threshold):
+        regressions += regressed
+        flag = '  REGRESSION' if regressed else ''
+        print(f'{name:<20} {old * 1e6:10.3f} -> {new * 1e6:10.3f} us/op {ratio - 1:+8.1%}{flag}')
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,17 +1,65 @@
+RANKS = ['A','2','3','4','5','6','7','8','9','10','J','Q','K']
+SUITS = ['♥','♦','♣','♠']
+RANK_INDEX = {rank: i for i, rank in enumerate(RANKS)}
+SUIT_INDEX = {suit: i for i, suit in enumerate(SUITS)}
+
+
 class Card:
-    def __init__(self,rank,suit=None,):
-        self.__suit = suit
-        self.__rank = rank
+    """One of 52 interned cards, identified by code = rank_index * 4 + suit_index.
+
+    Card(rank, suit) always returns the same instance for the same card, so
+    equality, hashing and `in` checks on hands are identity checks, and
+    sorting compares the precomputed rank_index.
+    """
+    __slots__ = ('code','rank_index')
+
+    def __new__(cls,rank,suit=None):
+        # a card made without a suit is the hearts one
+        suit_index = 0 if suit is None else SUIT_INDEX.get(suit)
+        if suit_index is None:
+            raise ValueError(f'Invalid suit: {suit!r}')
+        return POOL[RANK_INDEX[rank] * 4 + suit_index]
+
     def __lt__(self, other):
-        # Define rank order for comparison
-        rank_order = {'A': 1,'2': 2, '3': 3, '4': 4, '5': 5, '6': 6, '7': 7, '8': 8, '9': 9, '10': 10, 'J': 11, 'Q': 12, 'K': 13, }
         # Compare cards by rank
-        return rank_order[self.__rank] < rank_order[other.__rank]
-    
+        return self.rank_index < other.rank_index
+
     def __repr__(self):
-        return f"{self.__rank}"
-    
+        return RANKS[self.rank_index]
+
+    def __str__(self):
+        return self.id
+
+    def __reduce__(self):
+        return (from_code, (self.code,))
+
     def get_suit(self):
-        return self.__suit
+        return SUITS[self.code & 3]
     def get_rank(self):
-        return self.__rank
\ No newline at end of file
+        return RANKS[self.rank_index]
+
+    # attribute names used by the Qt frontend
+    @property
+    def suit(self):
+        return SUITS[self.code & 3]
+    @property
+    def value(self):
+        return RANKS[self.rank_index]
+    @property
+    def value_index(self):
+        return self.rank_index + 1
+    @property
+    def id(self):
+        return RANKS[self.rank_index] + SUITS[self.code & 3]
+
+
+def _make(code):
+    card = object.__new__(Card)
+    card.code = code
+    card.rank_index = code >> 2
+    return card
+
+POOL = tuple(_make(code) for code in range(52))
+
+def from_code(code):
+    return POOL[code]
@@ -1,4 +1,5 @@
 import random
+from collections import deque
 from card import Card
 """
 4 suits
@@ -7,36 +8,66 @@ diamonds = '\u2666'
 clubs = '\u2663'
 spades = '\u2660'
 
-52 cards
+52 cards a deck; a shoe of k decks holds k of each card
 
 """
 
+def decks_for(players):
+    # the smallest shoe that deals 3 cards to every seat and leaves one to draw
+    return max(1, -(-(3 * players + 1) // 52))
+
 
 class Deck:
-    def __init__(self):
-        self.cards = []
+    # the top of the deck is the left end of a deque, so draws are O(1)
+    # and recycled cards are appended underneath without touching the rest
+    def __init__(self,decks=1):
+        if decks < 1:
+            raise ValueError(f'A shoe needs at least one deck, not {decks}')
+        self.decks = decks
+        self.cards = deque()
         self.create_deck()
 
-    def shuffle_deck(self):
-            random.shuffle(self.cards)
+    def shuffle_deck(self,rng=random):
+            cards = list(self.cards)
+            rng.shuffle(cards)
+            self.cards = deque(cards)
 
     def create_deck(self):
         suits = ['\u2665','\u2666','\u2663','\u2660']
         ranks = ['A','2','3','4','5','6','7','8','9','10','J','Q','K']
         cards = [Card(rank,suit) for rank in ranks for suit in suits]
-        self.cards.extend(cards)
+        # cards are interned, so the copies of a card in a shoe are one object
+        for _ in range(self.decks):
+            self.cards.extend(cards)
+
+    def draw(self):
+        if not self.cards:
+            return None
+        return self.cards.popleft()
+
+    def draw_many(self,n):
+        if n > len(self.cards):
+            raise ValueError(f'Cannot draw {n} cards from a deck of {len(self.cards)}')
+        popleft = self.cards.popleft
+        return [popleft() for _ in range(n)]
+
+    def add_cards(self,cards,rng=random):
+        # only the recycled cards are shuffled; the live deck stays as it is
+        tail = list(cards)
+        rng.shuffle(tail)
+        self.cards.extend(tail)
+
+    def is_empty(self):
+        return not self.cards
 
+    def __len__(self):
+        return len(self.cards)
 
     def deal(self,players):
         
         for player in players:
             
             if not player.get_hand():
-                deal = self.cards[-3:]
-                self.cards = self.cards[:-3]
-                player.get_hand().extend(deal)
-                player.get_hand().sort()
-                if not player.is_cpu:
-                     player.print_cards()
-                     input('')
-              
\ No newline at end of file
+                for card in self.draw_many(3):
+                    player.give_hand(card)
+                player.sort_hand()
\ No newline at end of file
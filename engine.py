@@ -0,0 +1,232 @@
+import random
+import time
+import invariants
+import streams
+import zobrist
+from deck import Deck, decks_for
+from player import Player
+from pot import Pot
+
+"""
+Headless game of the CLI rules.
+
+The engine owns the whole game state (deck, pot, players, whose turn it is)
+and never prints or waits for input. Frontends drive it with draw()/
+apply_move()/step() and watch it through a listener callback, which is
+called as listener(event, player, card) for each of the events below.
+
+A game that reaches max_turns, or comes back to the same position at a
+reshuffle max_repeats times, ends as a draw with an END event and no
+winner. Between reshuffles the deck only shrinks, so a game that goes
+round in circles has to repeat a position right after a reshuffle. The
+engine keeps the Zobrist key of its position up to date as cards move and
+counts the keys seen after reshuffles.
+
+The shoe has as many decks as the table needs (deck.decks_for) unless
+given. Turns, win checks and reshuffles cost at most one pass over the
+seats, so tables of dozens of players play at the same speed per seat;
+the Zobrist keys cover up to zobrist.MAX_SEATS seats.
+
+Unless checks is 'off', every card that moves is booked in an
+invariants.Ledger, which raises InvariantError as soon as the deck, pot
+and hands stop adding up to the shoe.
+"""
+
+DEAL = 'deal'
+DRAW = 'draw'
+DISCARD = 'discard'
+RESHUFFLE = 'reshuffle'
+WIN = 'win'
+END = 'end'
+
+MAX_TURNS = 2000
+MAX_REPEATS = 3
+
+
+class Engine:
+    def __init__(self,players,seed=None,listener=None,max_turns=MAX_TURNS,max_repeats=MAX_REPEATS,decks=None,checks=None):
+        self.players = players
+        # every game gets a seed so that it can be replayed
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self.deck = Deck(decks_for(len(players)) if decks is None else decks)
+        self.deck.shuffle_deck(self.rng)
+        self.pot = Pot()
+        self.listeners = [listener] if listener is not None else []
+        self.turn = 0
+        self.turns = 0
+        self.reshuffles = 0
+        self.phase = DRAW
+        self.winner = None
+        self.over = False
+        self.max_turns = max_turns
+        self.max_repeats = max_repeats
+        self.zobrist = zobrist.Hasher(len(players),self.deck.cards)
+        self.ledger = invariants.ledger(len(players),self.deck.decks,checks)
+        self.paranoid = self.ledger is not None and self.ledger.paranoid
+        # times each position was seen right after a reshuffle, made on the first one
+        self.positions = None
+
+    def add_listener(self,listener):
+        self.listeners.append(listener)
+
+    def emit(self,event,player,card=None):
+        for listener in self.listeners:
+            listener(event,player,card)
+
+    def current_player(self):
+        return self.players[self.turn]
+
+    def deal(self):
+        self.deck.deal(self.players)
+        for seat, player in enumerate(self.players):
+            self.zobrist.deal(seat,player.get_hand())
+            if self.ledger is not None:
+                for card in player.get_hand():
+                    self.ledger.move(card.code,invariants.DECK,seat)
+            self.emit(DEAL,player)
+        if self.paranoid:
+            self.verify()
+
+    def verify(self):
+        # a paranoid ledger recounts every card; a cheap one only checks each move
+        self.ledger.verify(self.deck.cards,[player.get_hand() for player in self.players],self.pot.get_cards())
+
+    def draw(self):
+        if self.over or self.phase != DRAW:
+            raise ValueError('It is not time to draw')
+        player = self.current_player()
+        if self.deck.is_empty():
+            self.pot.pot_to_deck(self.deck,self.rng)
+            self.zobrist.reshuffle()
+            self.reshuffles += 1
+            if self.ledger is not None:
+                self.ledger.recycle()
+            self.emit(RESHUFFLE,player)
+            if self.repeated():
+                self.end(player)
+                return None
+        card = player.draw(self.deck)
+        self.zobrist.draw(self.turn,card.code)
+        if self.ledger is not None:
+            self.ledger.move(card.code,invariants.DECK,self.turn)
+            if self.paranoid:
+                self.verify()
+        self.emit(DRAW,player,card)
+        self.phase = DISCARD
+        if player.get_has_won():
+            self.win(player,card)
+        return card
+
+    def apply_move(self,rank=None):
+        # rank is the card a human throws; CPU players pick their own
+        if self.over or self.phase != DISCARD:
+            raise ValueError('It is not time to discard')
+        player = self.current_player()
+        if rank is None:
+            card = player.cpu_play(self.pot,self.rng,self)
+        else:
+            card = player.player_throw_card(rank,self.pot)
+            if card is None:
+                raise ValueError(f"{player} does not hold a {rank}")
+        self.zobrist.discard(self.turn,card.code)
+        if self.ledger is not None:
+            self.ledger.move(card.code,self.turn,invariants.POT)
+            if self.paranoid:
+                self.verify()
+        self.emit(DISCARD,player,card)
+        winner = player.check_pot(self.players,card)
+        if winner is not None:
+            self.zobrist.claim(self.players.index(winner),card.code)
+            # the claimed card is booked to its hand, though it stays on the pot's list as the game ends
+            if self.ledger is not None:
+                self.ledger.move(card.code,invariants.POT,self.players.index(winner))
+            winner.give_hand(card)
+            winner.sort_hand()
+            winner.set_has_won()
+            self.win(winner,card)
+            return card
+        self.turn = (self.turn + 1) % len(self.players)
+        self.turns += 1
+        self.phase = DRAW
+        if self.max_turns is not None and self.turns >= self.max_turns:
+            self.end(self.current_player())
+        return card
+
+    def repeated(self):
+        if self.positions is None:
+            self.positions = {}
+        key = self.zobrist.key
+        seen = self.positions[key] = self.positions.get(key,0) + 1
+        return self.max_repeats is not None and seen >= self.max_repeats
+
+    def step(self):
+        # advances one half-turn; a human discard has to go through apply_move
+        player = self.current_player()
+        if self.phase == DRAW:
+            return self.draw()
+        if not player.is_cpu:
+            raise ValueError(f'{player} has to choose a card to throw')
+        return self.apply_move()
+
+    def win(self,player,card):
+        self.winner = player
+        self.over = True
+        self.emit(WIN,player,card)
+
+    def end(self,player):
+        # a draw: nobody won within the turn limit, or the game went round in circles
+        self.over = True
+        self.emit(END,player)
+
+    def play(self):
+        # returns the winner, or None for a draw
+        while not self.over:
+            self.step()
+        return self.winner
+
+
+def simulate(n_games,seats=('E','H'),seed=None,log=None,start=0,results=None):
+    """Plays n_games between CPU seats (one level letter per seat) with no I/O.
+
+    Game i gets streams.game_seed(seed, i), for i from start, so any range of
+    games can be played separately and gives the same results.
+    Returns a dict with the win count of every seat, the number of drawn games and
+    the length of every game in turns.
+    Every game is recorded if log is an eventlog.EventLog, and appended as a
+    row to results if it is a results.ResultsStore. Invariants are checked at
+    $NJUKA_INVARIANTS, or not at all if it is unset.
+    """
+    master = random.getrandbits(64) if seed is None else seed
+    wins = [0] * len(seats)
+    draws = 0
+    lengths = []
+    checks = invariants.default_level(invariants.OFF)
+    started = time.perf_counter()
+    for index in range(start,start + n_games):
+        players = [Player(level=level) for level in seats]
+        game = Engine(players,seed=streams.game_seed(master,index),checks=checks)
+        if log is not None:
+            log.attach(game)
+        game.deal()
+        winner = game.play()
+        seat = -1 if winner is None else players.index(winner)
+        if winner is None:
+            draws += 1
+        else:
+            wins[seat] += 1
+        lengths.append(game.turns)
+        if results is not None:
+            results.append(seats,game.seed,seat,game.turns,game.reshuffles)
+    elapsed = time.perf_counter() - started
+    return {'games': n_games, 'seats': list(seats), 'wins': wins, 'draws': draws, 'lengths': lengths, 'seconds': elapsed}
+
+
+if __name__ == '__main__':
+    import sys
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    seats = sys.argv[2].split(',') if len(sys.argv) > 2 else ['E','H']
+    result = simulate(n,seats)
+    for seat, level in enumerate(result['seats']):
+        print(f"seat {seat + 1} ({level}): {result['wins'][seat] / n:.1%}")
+    print(f"{n / result['seconds']:.0f} games per second")
@@ -0,0 +1,204 @@
+import os
+import struct
+from engine import DEAL, DRAW, DISCARD, RESHUFFLE, WIN, END
+
+"""
+Append-only binary log of played games.
+
+A log file starts with MAGIC and holds one record per game:
+
+    header  <IQBBBI size of the rest of the record, seed, players,
+                    decks in the shoe, winning seat (255 for none), turns
+    deal    3 bytes per seat, the card codes dealt to it
+    events  2 bytes each: kind << 6 | seat, then a card code
+            (for RESHUFFLE, the number of cards recycled)
+
+A reshuffle recycles at most the cards that were not dealt, so a table
+whose shoe leaves more than 255 of them cannot be logged; GameRecord
+refuses it up front rather than clip the counts.
+
+A record is written in one piece when its game ends, through a buffered
+file, so a log never holds half a game. scan() reads only the headers and
+jumps from record to record, which is what analytics over millions of
+games need; replay() rebuilds one game's state at any turn.
+"""
+
+MAGIC = b'NJKL\x02'
+HEADER = struct.Struct('<IQBBBI')
+NO_WINNER = 255
+LOG_ENV = 'NJUKA_EVENT_LOG'
+
+KINDS = {DRAW: 0, DISCARD: 1, RESHUFFLE: 2, WIN: 3}
+KIND_NAMES = [DRAW, DISCARD, RESHUFFLE, WIN]
+
+
+class GameRecord:
+    def __init__(self, seed, players, decks=1):
+        if players > 63:
+            raise ValueError('The event log holds at most 63 seats')
+        if 52 * decks - 3 * players > 255:
+            raise ValueError(f'The event log cannot count the reshuffles of {decks} decks at {players} seats')
+        self.seed = seed or 0
+        self.players = players
+        self.decks = decks
+        self.hands = bytearray(3 * players)
+        self.events = bytearray()
+        self.winner = NO_WINNER
+        self.turns = 0
+
+    def deal(self, seat, cards):
+        self.hands[3 * seat:3 * seat + 3] = bytes(card.code for card in cards)
+
+    def add(self, kind, seat, value):
+        if kind == DISCARD:
+            self.turns += 1
+        elif kind == WIN:
+            self.winner = seat
+            # a discard claimed from the pot does not finish its turn
+            if self.events and self.events[-2] >> 6 == KINDS[DISCARD] and self.events[-1] == value:
+                self.turns -= 1
+        self.events += bytes((KINDS[kind] << 6 | seat, value))
+
+    def to_bytes(self):
+        body = self.hands + self.events
+        return HEADER.pack(HEADER.size - 4 + len(body), self.seed, self.players, self.decks,
+                           self.winner, self.turns) + body
+
+
+class EventLog:
+    def __init__(self, path, buffer_size=1 << 16):
+        self.path = path
+        self.file = open(path, 'ab', buffering=buffer_size)
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+        else:
+            with open(path, 'rb') as f:
+                if f.read(len(MAGIC)) != MAGIC:
+                    self.file.close()
+                    raise ValueError(f'{path} is not an event log of this version')
+
+    def write(self, record):
+        self.file.write(record.to_bytes())
+
+    def attach(self, game):
+        """Records an engine game; the record is written when someone wins or the game is drawn."""
+        record = GameRecord(game.seed, len(game.players), game.deck.decks)
+        seats = {id(player): seat for seat, player in enumerate(game.players)}
+
+        def listener(event, player, card):
+            seat = seats[id(player)]
+            if event == END:
+                self.write(record)
+                return
+            if event == DEAL:
+                record.deal(seat, player.get_hand())
+            elif event == RESHUFFLE:
+                record.add(event, seat, len(game.deck))
+            else:
+                record.add(event, seat, card.code)
+            if event == WIN:
+                self.write(record)
+
+        game.add_listener(listener)
+        return record
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def open_default():
+    # the log named by $NJUKA_EVENT_LOG, if any
+    path = os.environ.get(LOG_ENV)
+    return EventLog(path) if path else None
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        raise ValueError(f'{path} is not an event log of this version')
+    return data
+
+def scan(data):
+    """Yields (offset, seed, players, winner, turns) for every record, reading headers only."""
+    offset, end, unpack = len(MAGIC), len(data), HEADER.unpack_from
+    while offset < end:
+        size, seed, players, _, winner, turns = unpack(data, offset)
+        yield offset, seed, players, winner, turns
+        offset += 4 + size
+
+def summary(data):
+    # games, wins per seat and total turns, per table size
+    tables = {}
+    for _, _, players, winner, turns in scan(data):
+        stats = tables.setdefault(players, {'games': 0, 'wins': [0] * players, 'draws': 0, 'turns': 0})
+        stats['games'] += 1
+        stats['turns'] += turns
+        if winner == NO_WINNER:
+            stats['draws'] += 1
+        else:
+            stats['wins'][winner] += 1
+    return tables
+
+def events(data, offset):
+    # (kind, seat, value) for every event of the record at offset
+    size, _, players, _, _, _ = HEADER.unpack_from(data, offset)
+    start = offset + HEADER.size + 3 * players
+    for i in range(start, offset + 4 + size, 2):
+        yield KIND_NAMES[data[i] >> 6], data[i] & 63, data[i + 1]
+
+
+def replay(data, offset, turn=None):
+    """Rebuilds the game at offset, stopping before the given turn's draw.
+
+    Returns a dict with the hands (card codes per seat), the pot, cards left
+    in the deck, the turn reached, the seat to move and the winner if any.
+    """
+    size, seed, players, decks, _, _ = HEADER.unpack_from(data, offset)
+    deal = data[offset + HEADER.size:offset + HEADER.size + 3 * players]
+    hands = [sorted(deal[3 * seat:3 * seat + 3]) for seat in range(players)]
+    pot = []
+    state = {'seed': seed, 'hands': hands, 'pot': pot, 'deck': 52 * decks - 3 * players,
+             'turn': 0, 'seat': 0, 'winner': None}
+    last = None
+    for kind, seat, value in events(data, offset):
+        if kind == DRAW:
+            if turn is not None and state['turn'] >= turn:
+                break
+            hands[seat].append(value)
+            hands[seat].sort()
+            state['deck'] -= 1
+        elif kind == DISCARD:
+            hands[seat].remove(value)
+            pot.append(value)
+            state['turn'] += 1
+            state['seat'] = (seat + 1) % players
+        elif kind == RESHUFFLE:
+            state['deck'] += value
+            del pot[:value]
+        elif kind == WIN:
+            state['winner'] = seat
+            state['seat'] = seat
+            if last == DISCARD:
+                hands[seat].append(value)
+                hands[seat].sort()
+                state['turn'] -= 1
+        last = kind
+    return state
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+    start = time.perf_counter()
+    data = read(sys.argv[1])
+    games = 0
+    for players, stats in sorted(summary(data).items()):
+        games += stats['games']
+        rates = ', '.join(f'{w / stats["games"]:.1%}' for w in stats['wins'])
+        print(f"{players} players: {stats['games']} games, {stats['turns'] / stats['games']:.1f} turns, "
+              f"{stats['draws']} unfinished, wins by seat {rates}")
+    print(f'scanned {games} games in {time.perf_counter() - start:.2f}s')
@@ -0,0 +1,298 @@
+import argparse
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import sys
+from time import perf_counter_ns
+import invariants
+import streams
+from deck import Deck
+from engine import Engine
+from player import Player
+from pot import Pot
+
+"""
+Opt-in counters and timers for the game's hot paths.
+
+enable() wraps the instrumented methods (draw, discard, the win checks,
+reshuffles and CPU decisions, per level) with timers and puts the originals
+back on disable(), so a game that is not being measured runs exactly the
+code it always did. Timers keep a count, a total and a histogram of
+durations in power-of-two nanosecond buckets; counters are plain counts.
+The Qt rules and window are instrumented too if njuka_working and
+njuka_gui have been imported before enable() is called.
+
+    python instrument.py -n 2000 --seats E,H,O -o stats.json
+    python instrument.py --profile 42 --seats E,M
+
+Setting $NJUKA_INSTRUMENT to a file name makes the Qt frontend enable
+instrumentation and write its stats there on exit.
+"""
+
+INSTRUMENT_ENV = 'NJUKA_INSTRUMENT'
+
+
+class Timer:
+    __slots__ = ('count', 'total', 'min', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+        # bucket b holds durations of 2**(b-1) to 2**b - 1 ns
+        self.buckets = {}
+
+    def add(self, ns):
+        self.count += 1
+        self.total += ns
+        if self.min is None or ns < self.min:
+            self.min = ns
+        if ns > self.max:
+            self.max = ns
+        bucket = ns.bit_length()
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        self.max = max(self.max, other.max)
+        for bucket, n in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + n
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total_ns': self.total,
+            'mean_ns': self.total / self.count if self.count else 0,
+            'min_ns': self.min or 0,
+            'max_ns': self.max,
+            'histogram': {str(1 << b >> 1): n for b, n in sorted(self.buckets.items())},
+        }
+
+
+class Stats:
+    def __init__(self):
+        self.timers = {}
+        self.counters = {}
+
+    def time(self, name, ns):
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = self.timers[name] = Timer()
+        timer.add(ns)
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def merge(self, other):
+        for name, timer in other.timers.items():
+            self.timers.setdefault(name, Timer()).merge(timer)
+        for name, n in other.counters.items():
+            self.count(name, n)
+
+    def to_dict(self):
+        return {
+            'timers': {name: timer.to_dict() for name, timer in sorted(self.timers.items())},
+            'counters': dict(sorted(self.counters.items())),
+        }
+
+
+stats = Stats()
+_patched = []
+
+
+def timed(name, count=None):
+    """Wraps fn to time every call under name.
+
+    name may be a function of the call's arguments, to split a timer by them;
+    count(args, result) may return the name of a counter to bump.
+    """
+    def wrap(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = perf_counter_ns()
+            result = fn(*args, **kwargs)
+            stats.time(name(args) if callable(name) else name, perf_counter_ns() - start)
+            if count is not None:
+                counter = count(args, result)
+                if counter:
+                    stats.count(counter)
+            return result
+        return wrapper
+    return wrap
+
+
+def cpu_level(args):
+    return f'cpu.{args[0].level.upper()}'
+
+def won(args, result):
+    return 'win_check.wins' if result else None
+
+def reshuffle(args):
+    # the Qt deck's add_cards runs through this one, so a reshuffle is timed and counted once
+    return 'reshuffle.add_cards' if type(args[0]) is Deck else 'gui.reshuffle'
+
+def recycled(args, result):
+    stats.count('reshuffle.cards', len(args[1]))
+
+
+def hooks():
+    # (owner, attribute, wrapper) for everything enable() instruments
+    found = [
+        (Player, 'draw', timed('draw')),
+        (Player, 'throw', timed('discard')),
+        (Player, 'player_throw_card', timed('discard')),
+        (Player, 'has_winning_hand', timed('win_check.hand', won)),
+        (Player, 'check_pot', timed('win_check.pot', won)),
+        (Player, 'cpu_play', timed(cpu_level)),
+        (Pot, 'pot_to_deck', timed('reshuffle.pot_to_deck')),
+        (Deck, 'add_cards', timed(reshuffle, recycled)),
+        (Deck, 'shuffle_deck', timed('deck.shuffle')),
+        (Engine, 'deal', timed('game.deal')),
+    ]
+    rules = sys.modules.get('njuka_working')
+    if rules is not None:
+        found += [
+            (rules.Player, 'draw', timed('gui.draw')),
+            (rules.Player, 'discard', timed('gui.discard')),
+            (rules, 'is_winning_combination', timed('gui.win_check.hand', won)),
+            (rules, 'check_any_player_win', timed('gui.win_check.any', won)),
+        ]
+    gui = sys.modules.get('njuka_gui')
+    if gui is not None:
+        found += [
+            # the window calls its own binding of check_any_player_win
+            (gui, 'check_any_player_win', timed('gui.win_check.any', won)),
+            (gui.Game, 'update_display', timed('gui.update_display')),
+            (gui.Game, 'cpu_turn', timed('gui.cpu_turn')),
+            (gui.Game, 'cpu_decision', timed_decision),
+        ]
+    return found
+
+def timed_decision(fn):
+    # Game.cpu_decision returns the choice for the worker thread to run; that is what gets timed
+    @functools.wraps(fn)
+    def wrapper(game, cpu):
+        choose = fn(game, cpu)
+        name = f'gui.cpu.{game.cpu_level}'
+        def timed_choose():
+            start = perf_counter_ns()
+            result = choose()
+            stats.time(name, perf_counter_ns() - start)
+            return result
+        return timed_choose
+    return wrapper
+
+
+def enable():
+    if _patched:
+        return
+    for owner, attribute, wrap in hooks():
+        original = owner.__dict__[attribute]
+        _patched.append((owner, attribute, original))
+        setattr(owner, attribute, wrap(original))
+
+def disable():
+    while _patched:
+        owner, attribute, original = _patched.pop()
+        setattr(owner, attribute, original)
+
+def enabled():
+    return bool(_patched)
+
+def reset():
+    global stats
+    stats = Stats()
+
+
+def play(seats, seed):
+    players = [Player(level=level) for level in seats]
+    game = Engine(players, seed=seed, checks=invariants.default_level(invariants.OFF))
+    game.deal()
+    game.play()
+    return game
+
+def measure_games(n_games, seats=('E', 'H'), seed=0, per_game=False):
+    """Plays n_games with instrumentation on and returns the aggregate stats, and each game's if per_game."""
+    total = Stats()
+    games = []
+    was_enabled = enabled()
+    enable()
+    try:
+        for index in range(n_games):
+            reset()
+            game = play(seats, streams.game_seed(seed, index))
+            stats.count('game.turns', game.turns)
+            if game.winner is None:
+                stats.count('game.draws')
+            else:
+                stats.count('game.wins.seat' + str(game.players.index(game.winner)))
+            total.merge(stats)
+            if per_game:
+                games.append(dict(stats.to_dict(), seed=game.seed))
+    finally:
+        if not was_enabled:
+            disable()
+    result = {'games': n_games, 'seats': list(seats), 'seed': seed, 'aggregate': total.to_dict()}
+    if per_game:
+        result['per_game'] = games
+    return result
+
+
+def profile_game(seed, seats=('E', 'H'), path=None, limit=25):
+    """Plays the game with the given seed under cProfile; dumps the profile to path and returns the top entries."""
+    profile = cProfile.Profile()
+    profile.enable()
+    play(seats, seed)
+    profile.disable()
+    if path:
+        profile.dump_stats(path)
+    out = io.StringIO()
+    pstats.Stats(profile, stream=out).sort_stats('cumulative').print_stats(limit)
+    return out.getvalue()
+
+
+def dump(path, data=None):
+    with open(path, 'w') as f:
+        json.dump(stats.to_dict() if data is None else data, f, indent=2)
+
+def from_env():
+    # used by the Qt frontend: turns instrumentation on if $NJUKA_INSTRUMENT names a file
+    path = os.environ.get(INSTRUMENT_ENV)
+    if path:
+        enable()
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure where time goes in headless games.')
+    parser.add_argument('-n', '--games', type=int, default=1000)
+    parser.add_argument('--seats', default='E,H', help='CPU level per seat, e.g. E,H,O')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', help='write the stats to this JSON file')
+    parser.add_argument('--per-game', action='store_true', help='include every game in the JSON output')
+    parser.add_argument('--profile', type=int, metavar='SEED', help='profile the game with this seed instead')
+    parser.add_argument('--profile-out', help='write the cProfile data to this file')
+    args = parser.parse_args()
+    seats = [level.upper() for level in args.seats.split(',')]
+    if args.profile is not None:
+        print(profile_game(args.profile, seats, args.profile_out))
+        return
+    result = measure_games(args.games, seats, args.seed, args.per_game)
+    if args.output:
+        dump(args.output, result)
+    aggregate = result['aggregate']
+    for name, timer in aggregate['timers'].items():
+        print(f"{name:<24} {timer['count']:>10} calls {timer['mean_ns'] / 1000:10.2f} us mean "
+              f"{timer['total_ns'] / 1e6:10.1f} ms total")
+    for name, n in aggregate['counters'].items():
+        print(f'{name:<24} {n:>10}')
+
+if __name__ == '__main__':
+    main()
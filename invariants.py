@@ -0,0 +1,119 @@
+import os
+from card import from_code
+
+"""
+Card conservation checks that cost O(1) per move.
+
+A Ledger knows where every card of the shoe is: in the deck, the pot or one
+of the hands. Each of these zones is an int with a lane of bits per card
+code, holding the number of copies of that card in the zone. A lane is
+decks.bit_length() bits wide, so for a single deck the zones are 52-bit
+masks. Every move takes a card out of one zone and into another. It is
+refused, with an InvariantError, if the card is not in the zone it is said
+to come from. Since every card starts in the deck, the zones then always add
+up to the full shoe, with no card missing or duplicated.
+
+The level sets how much is checked:
+
+    off       no ledger at all
+    cheap     every move is checked against the ledger; the Qt window also
+              checks the hands it changes against their zones, which is
+              O(1) too as a hand holds at most 4 cards
+    paranoid  as cheap, and the deck, pot and hands are recounted from the
+              game's own lists after every move
+
+$NJUKA_INVARIANTS picks the level. Tables people play at default to cheap;
+bulk simulations default to off, since even cheap books a dozen or so
+moves per game.
+"""
+
+OFF = 'off'
+CHEAP = 'cheap'
+PARANOID = 'paranoid'
+LEVELS = (OFF, CHEAP, PARANOID)
+INVARIANTS_ENV = 'NJUKA_INVARIANTS'
+
+# zones after the seats: zones[seat] is a hand, zones[DECK] and zones[POT] the rest
+DECK = -2
+POT = -1
+
+
+class InvariantError(AssertionError):
+    pass
+
+
+# one card of every code, for each lane width
+_ONES = {}
+
+def ones(width):
+    value = _ONES.get(width)
+    if value is None:
+        value = _ONES[width] = sum(1 << width * code for code in range(52))
+    return value
+
+
+def default_level(default=CHEAP):
+    level = os.environ.get(INVARIANTS_ENV, default).lower()
+    if level not in LEVELS:
+        raise ValueError(f'{INVARIANTS_ENV} must be one of {", ".join(LEVELS)}, not {level!r}')
+    return level
+
+
+class Ledger:
+    def __init__(self, seats, decks=1, level=CHEAP):
+        self.seats = seats
+        self.decks = decks
+        self.level = level
+        self.paranoid = level == PARANOID
+        self.width = decks.bit_length()
+        self.lane = (1 << self.width) - 1
+        self.full = decks * ones(self.width)
+        self.zones = [0] * seats + [self.full, 0]
+
+    def lanes(self, cards):
+        # the zone value of a collection of cards
+        width = self.width
+        return sum([1 << width * card.code for card in cards])
+
+    def where(self, zone):
+        return 'the deck' if zone == DECK else 'the pot' if zone == POT else f'seat {zone}'
+
+    def move(self, code, src, dst):
+        zones = self.zones
+        shift = self.width * code
+        if not zones[src] >> shift & self.lane:
+            raise InvariantError(f'{from_code(code)} moved from {self.where(src)}, which does not hold it')
+        zones[src] -= 1 << shift
+        zones[dst] += 1 << shift
+
+    def recycle(self, keep=None):
+        # the pot goes back into the deck, but for its top card if keep is its code
+        top = 0 if keep is None else 1 << self.width * keep
+        zones = self.zones
+        if top and not zones[POT] & top * self.lane:
+            raise InvariantError(f'{from_code(keep)} stays in the pot, which does not hold it')
+        zones[DECK] += zones[POT] - top
+        zones[POT] = top
+
+    def check_hand(self, seat, cards):
+        if self.lanes(cards) != self.zones[seat]:
+            raise InvariantError(f'seat {seat} holds {[str(card) for card in cards]}, '
+                                 'which is not what was dealt, drawn and thrown')
+
+    def verify(self, deck, hands, pot):
+        """Recounts every card from the game's lists; O(size of the shoe)."""
+        counted = [self.lanes(hand) for hand in hands] + [self.lanes(deck), self.lanes(pot)]
+        if sum(counted) != self.full:
+            raise InvariantError('the deck, pot and hands do not add up to the shoe')
+        for zone, (value, expected) in enumerate(zip(counted, self.zones)):
+            if value != expected:
+                raise InvariantError(f'{self.where(zone - len(counted) if zone >= self.seats else zone)} '
+                                     'does not hold the cards the ledger says')
+
+
+def ledger(seats, decks=1, level=None):
+    """A Ledger for a table at level (default $NJUKA_INVARIANTS), or None when checks are off."""
+    level = default_level() if level is None else level
+    if level not in LEVELS:
+        raise ValueError(f'The invariant level must be one of {", ".join(LEVELS)}, not {level!r}')
+    return None if level == OFF else Ledger(seats, decks, level)
@@ -0,0 +1,120 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+from card import RANKS
+
+"""
+Load test for server.py.
+
+Opens many simulated human seats, sits them at tables of --humans seats
+plus CPU players, and has each seat play whole games as fast as the server
+answers: draw on its turn, then throw a random card. A move's latency is
+the time from sending it to receiving the server's event for it. Reports
+moves per second and latency percentiles once --seconds have passed.
+"""
+
+
+class Seat:
+    def __init__(self, index, args, latencies, stop):
+        self.index = index
+        self.args = args
+        self.latencies = latencies
+        self.stop = stop
+        self.rng = random.Random(index)
+        self.games = 0
+        self.errors = 0
+
+    async def connect(self):
+        if self.args.unix:
+            return await asyncio.open_unix_connection(self.args.unix)
+        return await asyncio.open_connection(self.args.host, self.args.port)
+
+    async def request(self, writer, message):
+        writer.write(json.dumps(message).encode() + b'\n')
+        await writer.drain()
+
+    async def run(self):
+        reader, writer = await self.connect()
+        try:
+            while time.perf_counter() < self.stop:
+                table = f'load-{self.index // self.args.humans}-{self.games}'
+                await self.request(writer, {'op': 'join', 'table': table, 'name': f'seat {self.index}',
+                                            'humans': self.args.humans, 'cpus': self.args.cpus})
+                await self.play(reader, writer)
+                self.games += 1
+        finally:
+            writer.close()
+
+    async def play(self, reader, writer):
+        seat, hand, sent = None, [], None
+        while True:
+            line = await reader.readline()
+            if not line:
+                raise ConnectionError('server closed the connection')
+            event = json.loads(line)
+            kind = event['event']
+            if kind == 'joined':
+                seat = event['seat']
+            elif kind == 'error':
+                self.errors += 1
+            elif kind in ('win', 'end', 'closed'):
+                return
+            elif event.get('seat') != seat:
+                continue
+            elif kind == 'deal':
+                hand = event['hand']
+            elif kind in ('draw', 'discard'):
+                if sent is not None:
+                    self.latencies.append(time.perf_counter() - sent)
+                    sent = None
+                if kind == 'draw':
+                    hand.append(event['card'])
+                else:
+                    hand.remove(event['card'])
+            if kind == 'turn':
+                if event['phase'] == 'draw':
+                    message = {'op': 'draw'}
+                else:
+                    message = {'op': 'discard', 'rank': RANKS[self.rng.choice(hand) >> 2]}
+                sent = time.perf_counter()
+                await self.request(writer, message)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+async def load(args):
+    latencies = []
+    start = time.perf_counter()
+    stop = start + args.seconds
+    seats = [Seat(i, args, latencies, stop) for i in range(args.seats)]
+    results = await asyncio.gather(*(seat.run() for seat in seats), return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    failures = [r for r in results if isinstance(r, Exception)]
+    print(f'{args.seats} seats, {sum(s.games for s in seats)} games, {len(latencies)} moves in {elapsed:.1f}s')
+    print(f'{len(latencies) / elapsed:.0f} moves per second')
+    print(f'latency p50 {percentile(latencies, 0.5) * 1000:.2f}ms, '
+          f'p99 {percentile(latencies, 0.99) * 1000:.2f}ms, max {max(latencies, default=0) * 1000:.2f}ms')
+    if failures or any(s.errors for s in seats):
+        print(f'{len(failures)} seats failed, {sum(s.errors for s in seats)} error events')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the game server with simulated seats.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help='connect to this Unix socket path instead of TCP')
+    parser.add_argument('-s', '--seats', type=int, default=200, help='simulated human seats')
+    parser.add_argument('--humans', type=int, default=2, help='human seats per table')
+    parser.add_argument('--cpus', default='E,H', help='CPU levels added to every table')
+    parser.add_argument('-t', '--seconds', type=float, default=10.0)
+    args = parser.parse_args()
+    args.cpus = [level for level in args.cpus.split(',') if level]
+    asyncio.run(load(args))
+
+if __name__ == '__main__':
+    main()
@@ -1,26 +1,21 @@
-from card import Card
-from deck import Deck
+import eventlog
+import solver
+from engine import Engine, DEAL, DRAW, DISCARD, WIN, END
 from player import Player
-from pot import Pot
-
-
-game_pot = Pot()
-game_deck = Deck()
-game_deck.shuffle_deck()
 
 
 def create_players(num_of_players):
     players = []
 
     for i in range(num_of_players):
-        
+
         name = input(f'Enter the name of player {i + 1} (or leave blank for CPU player): ')
-        
+
         if name.strip() == '':
             valid_level = False
             while not valid_level:
-               level = input('Choose difficulty. (E)asy or (H)ard: ').strip().upper()
-               if level == 'E' or level == 'H':
+               level = input('Choose difficulty. (E)asy, (H)ard, (O)ptimal, (M)onte Carlo or (L)earned: ').strip().upper()
+               if level in ('E','H','O','M','L'):
                    break
             player = Player(level=level)
             print()
@@ -30,6 +25,38 @@ def create_players(num_of_players):
 
     return players
 
+def show_event(event,player,card):
+    if event == DEAL:
+        if not player.is_cpu:
+            player.print_cards()
+            input('')
+    elif event == DRAW:
+        if not player.is_cpu:
+            print(f'You drew a {card.get_rank()}')
+            player.print_cards()
+    elif event == DISCARD:
+        player.print_discarded(card)
+        if player.is_cpu:
+            print(f'{player} throws card {card!r}')
+            print(f"{player} is holding: {[card.__repr__() for card in player.get_hand()]}")
+        else:
+            player.print_cards()
+        input()
+    elif event == WIN:
+        print(f'***{player.get_player_name()} has won with {card.get_rank()}***')
+        print()
+        player.print_cards()
+        print('***GAME OVER***')
+    elif event == END:
+        print('***Nobody can win this one, the game is a draw***')
+        print('***GAME OVER***')
+
+def show_hint(player,pot,decks=1):
+    # the hand is sorted, so the solver's position points straight into it
+    hand = player.get_hand()
+    position, chance = solver.hint([card.rank_index for card in hand],[card.rank_index for card in pot.get_cards()],decks=decks)
+    print(f'Hint: throw a {hand[position]!r} for a {chance:.1%} chance to win in your next {solver.HORIZON} draws')
+
 def gameloop():
     while True:
         try:
@@ -44,32 +71,34 @@ def gameloop():
     for player in players:
         print(f'Player added: {player}')
     print()
-    game_deck.deal(players)
-    print()
-    game_won = False
+    game = Engine(players,listener=show_event)
+    if game.deck.decks > 1:
+        print(f'Playing from a shoe of {game.deck.decks} decks')
+    log = eventlog.open_default()
+    try:
+        if log:
+            log.attach(game)
+        game.deal()
+        print()
 
-    while not game_won:
-        for player in players:
-            player.draw_card(game_deck,game_pot)
-            if player.get_has_won():
-                print(f'***{player.get_player_name()} has won***')
-                game_won = True
-                break
-            if game_won:
-                break
-            if player.is_cpu:
-                print('cpu plays')
-                player.cpu_play(game_pot)
+        while not game.over:
+            player = game.current_player()
+            if game.phase == DRAW or player.is_cpu:
+                if game.phase == DISCARD:
+                    print('cpu plays')
+                game.step()
+                continue
+
+            show_hint(player,game.pot,game.deck.decks)
+            card_to_throw = input('Which card do you want to throw down? ').upper()
+            if card_to_throw in [card.__repr__() for card in player.get_hand()]:
+                game.apply_move(card_to_throw)
+            else:
+                print("You can't lose what you don't have buddy")
+    finally:
+        # written out now rather than whenever the interpreter gets round to it
+        if log:
+            log.close()
 
-            if not player.is_cpu:
-                while True:
-                    
-                    card_to_throw = input('Which card do you want to throw down? ').upper()
-                    if card_to_throw in [card.__repr__() for card in player.get_hand()]:
-                        player.player_throw_card(card_to_throw,game_pot,players)
-                        input()
-                        break
-                    else:
-                        print("You can't lose what you don't have buddy")
-                    
-gameloop()
\ No newline at end of file
+if __name__ == '__main__':
+    gameloop()
@@ -0,0 +1,243 @@
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+import solver
+import zobrist
+from wintable import CLI_WIN, GUI_WIN, build_outs, pack, pack3
+
+"""
+Information-set Monte Carlo tree search for the discard decision.
+
+Only ranks matter to the win rules, so a simulated game is a few lists of
+rank ints: one sorted hand per seat, the deck and the pot. Every iteration
+deals the cards the searching player cannot see (opponents' hands and the
+deck order) at random, walks the tree of the player's own decisions and
+finishes the game with the solver's policy table for the same rules ('cli'
+or the Qt window's 'gui') for every seat. budget_ms is the thinking time
+per move.
+
+A node is what the player knows: the hand they hold after their n-th draw
+of the game. Nodes live in a zobrist.TranspositionTable under the Zobrist
+key of that hand and n, so the discards that lead to the same hand share
+one node, and the next turn's search starts from the node it lands in if
+it was visited. With workers > 1 the same search runs in other processes too and
+their root statistics are added up (root parallelism).
+"""
+
+BUDGET_MS = 50
+EXPLORATION = 0.7
+MAX_DEPTH = 3
+ROLLOUT_TURNS = 200
+TABLE_SIZE = 1 << 14
+WIN_TABLES = {'cli': CLI_WIN, 'gui': GUI_WIN}
+
+
+class Node:
+    __slots__ = ('total', 'visits', 'wins')
+
+    def __init__(self):
+        self.total = 0
+        self.visits = [0, 0, 0, 0]
+        self.wins = [0, 0, 0, 0]
+
+    def select(self, hand, exploration):
+        # UCB1 over the distinct ranks in the sorted hand
+        best, best_score = 0, -1.0
+        log_total = math.log(self.total + 1)
+        for i in range(4):
+            if i and hand[i] == hand[i - 1]:
+                continue
+            visits = self.visits[i]
+            if not visits:
+                return i
+            score = self.wins[i] / visits + exploration * math.sqrt(log_total / visits)
+            if score > best_score:
+                best, best_score = i, score
+        return best
+
+
+def node_key(hand, draws):
+    # the player's hand after their draws-th draw, as a one-seat position
+    return zobrist.position_key([[rank << 2 for rank in hand]], None, (), draws % zobrist.MAX_SEATS)
+
+
+def draw(hands, deck, pot, seat, rng):
+    if not deck:
+        deck.extend(pot)
+        pot.clear()
+        rng.shuffle(deck)
+    hand = hands[seat]
+    hand.append(deck.pop())
+    hand.sort()
+    return hand
+
+def discard(hands, pot, seat, slot, outs):
+    # returns the seat that claims the discard, or -1
+    card = hands[seat].pop(slot)
+    pot.append(card)
+    for other, hand in enumerate(hands):
+        if other != seat and outs[pack3(hand)] >> card & 1:
+            return other
+    return -1
+
+def rollout(hands, deck, pot, seat, table, outs, policy, rng, holding=False):
+    # plays on with the policy table from seat; holding means seat has already drawn
+    for _ in range(ROLLOUT_TURNS):
+        if holding:
+            hand = hands[seat]
+            holding = False
+        else:
+            hand = draw(hands, deck, pot, seat, rng)
+            if table[pack(hand)]:
+                return seat
+        claimant = discard(hands, pot, seat, policy[pack(hand)], outs)
+        if claimant >= 0:
+            return claimant
+        seat = (seat + 1) % len(hands)
+    return -1
+
+
+class Searcher:
+    def __init__(self, budget_ms=BUDGET_MS, workers=1, rules='cli', seed=None, decks=1):
+        if rules not in WIN_TABLES:
+            raise ValueError(f"The rules must be one of {', '.join(WIN_TABLES)}, not {rules!r}")
+        self.budget_ms = budget_ms
+        self.decks = decks
+        self.workers = workers
+        self.rules = rules
+        self.table = WIN_TABLES[rules]
+        self.outs = outs_for(self.table)
+        self.rng = random.Random(seed)
+        self.exploration = EXPLORATION
+        self.max_depth = MAX_DEPTH
+        self.nodes = zobrist.TranspositionTable(TABLE_SIZE)
+        # the player's draws so far in the game, one per choose()
+        self.draws = 0
+        self.iterations = 0
+
+    def reset(self):
+        self.nodes.clear()
+        self.draws = 0
+
+    def choose(self, hand, me, hand_sizes, deck_size, pot):
+        """Returns the position in the sorted 4-card hand of the card to throw.
+
+        hand and pot are rank indexes, hand_sizes has the hand length of every seat.
+        """
+        hand = sorted(hand)
+        key = node_key(hand, self.draws)
+        root = self.nodes.get(key)
+        if root is None:
+            root = Node()
+            self.nodes.put(key, root, self.max_depth)
+        futures = []
+        if self.workers > 1:
+            pool = worker_pool(self.workers - 1)
+            args = (hand, me, hand_sizes, deck_size, pot, self.budget_ms, self.rules, self.decks)
+            futures = [pool.submit(search_worker, args, self.rng.getrandbits(64)) for _ in range(self.workers - 1)]
+        self.search(root, hand, me, hand_sizes, deck_size, pot)
+        visits = list(root.visits)
+        for future in futures:
+            for i, v in enumerate(future.result()):
+                visits[i] += v
+        self.draws += 1
+        return max(range(4), key=visits.__getitem__)
+
+    def search(self, root, hand, me, hand_sizes, deck_size, pot):
+        counts = solver.unseen(hand, decks=self.decks)
+        counts = [c - pot.count(r) for r, c in enumerate(counts)]
+        unknown = [r for r, c in enumerate(counts) for _ in range(max(c, 0))]
+        hidden = sum(size for seat, size in enumerate(hand_sizes) if seat != me)
+        deck_size = max(0, min(deck_size, len(unknown) - hidden))
+        policy = solver.policy(self.rules)
+        deadline = time.perf_counter() + self.budget_ms / 1000
+        iterations = 0
+        while True:
+            self.iterate(root, hand, unknown, me, hand_sizes, deck_size, pot, policy)
+            iterations += 1
+            if iterations & 15 == 0 and time.perf_counter() >= deadline:
+                break
+        self.iterations = iterations
+        return root
+
+    def iterate(self, root, hand, unknown, me, hand_sizes, deck_size, pot, policy):
+        rng, table, outs = self.rng, self.table, self.outs
+        cards = unknown[:]
+        rng.shuffle(cards)
+        hands = []
+        for seat, size in enumerate(hand_sizes):
+            if seat == me:
+                hands.append(hand[:])
+            else:
+                hands.append(sorted(cards[:size]))
+                del cards[:size]
+        deck = cards[:deck_size]
+        pot = pot[:]
+        n = len(hands)
+
+        node, path, expanded = root, [], False
+        while True:
+            slot = node.select(hands[me], self.exploration)
+            path.append((node, slot))
+            winner = discard(hands, pot, me, slot, outs)
+            seat = (me + 1) % n
+            while winner < 0 and seat != me:
+                winner = rollout_turn(hands, deck, pot, seat, table, outs, policy, rng)
+                seat = (seat + 1) % n
+            if winner < 0:
+                mine = draw(hands, deck, pot, me, rng)
+                if table[pack(mine)]:
+                    winner = me
+            if winner >= 0:
+                break
+            key = node_key(hands[me], self.draws + len(path))
+            child = self.nodes.get(key)
+            if child is None:
+                if expanded or len(path) >= self.max_depth:
+                    winner = rollout(hands, deck, pot, me, table, outs, policy, rng, holding=True)
+                    break
+                child = Node()
+                # nodes nearer the root are kept over deeper ones
+                self.nodes.put(key, child, self.max_depth - len(path))
+                expanded = True
+            node = child
+
+        reward = 1 if winner == me else 0
+        for node, slot in path:
+            node.total += 1
+            node.visits[slot] += 1
+            node.wins[slot] += reward
+
+
+def rollout_turn(hands, deck, pot, seat, table, outs, policy, rng):
+    hand = draw(hands, deck, pot, seat, rng)
+    if table[pack(hand)]:
+        return seat
+    return discard(hands, pot, seat, policy[pack(hand)], outs)
+
+
+_outs = {}
+
+def outs_for(table):
+    # outs tables are built once per win table and process
+    key = bytes(table)
+    if key not in _outs:
+        _outs[key] = build_outs(table)
+    return _outs[key]
+
+
+_pool = None
+
+def worker_pool(size):
+    global _pool
+    if _pool is None or _pool._max_workers != size:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool = ProcessPoolExecutor(size)
+    return _pool
+
+def search_worker(args, seed):
+    hand, me, hand_sizes, deck_size, pot, budget_ms, rules, decks = args
+    searcher = Searcher(budget_ms, rules=rules, seed=seed, decks=decks)
+    return searcher.search(Node(), hand, me, hand_sizes, deck_size, pot).visits
@@ -0,0 +1,737 @@
+import os
+import sys
+from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QLabel, QPushButton,
+                            QHBoxLayout, QMessageBox, QInputDialog, QComboBox, QCheckBox, QScrollArea)
+from PyQt5.QtGui import QFont
+from PyQt5.QtCore import Qt, QTimer, QObject, QThread, pyqtSignal, pyqtSlot
+import eventlog
+import invariants
+import mcts
+import results
+import solver
+import streams
+import zobrist
+from deck import decks_for
+from engine import MAX_REPEATS, MAX_TURNS
+from njuka_working import Deck, Player, check_any_player_win
+
+"""
+The Qt window for the rules in njuka_working.
+
+Importing this module loads PyQt5; njuka_working imports it lazily, when
+Game is first looked up there, so the rules stay usable without Qt.
+"""
+
+CPU_LEVELS = ['Random', 'MCTS']
+# tables above 17 seats play from a shoe of several decks
+MAX_CPUS = 49
+# pause before each CPU turn, in milliseconds; 0 fast-forwards
+SPEEDS = [('Normal', 1000), ('Fast', 250), ('Instant', 0)]
+
+# stylesheets are built once and only applied when a widget's colour changes
+RED_SUITS = ('♥', '♦')
+CARD_STYLES = {
+    True: "color: red; border: 2px solid black; background: white; font-weight: bold;",
+    False: "color: black; border: 2px solid black; background: white; font-weight: bold;",
+}
+CARD_BACK_STYLE = "color: black; border: 2px solid black; background: white;"
+POT_STYLES = {
+    True: """
+        background-color: #DC143C;
+        color: red;
+        border: 3px solid #8B0000;
+        border-radius: 10px;
+    """,
+    False: """
+        background-color: #DC143C;
+        color: black;
+        border: 3px solid #8B0000;
+        border-radius: 10px;
+    """,
+    None: """
+        background-color: #DC143C;
+        color: white;
+        border: 3px solid #8B0000;
+        border-radius: 10px;
+    """,
+}
+
+class CpuWorker(QObject):
+    # runs CPU decisions off the GUI thread and hands the discard index back
+    decided = pyqtSignal(int, int)
+
+    @pyqtSlot(int, object)
+    def decide(self, token, choose):
+        try:
+            index = choose()
+        except Exception:
+            index = -1
+        self.decided.emit(token, index)
+
+class CpuRow:
+    # one opponent: a name and four pooled card backs, shown or hidden as the hand size changes
+    def __init__(self, game):
+        self.widget = QWidget()
+        layout = QHBoxLayout(self.widget)
+        layout.setSpacing(10)
+        self.name_label = QLabel()
+        self.name_label.setFont(QFont('Arial', 12))
+        layout.addWidget(self.name_label)
+        self.backs = [game._card_label("🂠", CARD_BACK_STYLE) for _ in range(4)]
+        for back in self.backs:
+            layout.addWidget(back)
+        self.name = None
+        self.size = 4
+        self.visible = True
+
+    def show(self, cpu):
+        if cpu.name != self.name:
+            self.name = cpu.name
+            self.name_label.setText(cpu.name)
+        size = len(cpu.hand)
+        if size != self.size:
+            for i, back in enumerate(self.backs):
+                if (i < size) != (i < self.size):
+                    back.setVisible(i < size)
+            self.size = size
+        if not self.visible:
+            self.widget.show()
+            self.visible = True
+
+    def hide(self):
+        if self.visible:
+            self.widget.hide()
+            self.visible = False
+
+class Game(QWidget):
+    request_decision = pyqtSignal(int, object)
+
+    def __init__(self):
+        super().__init__()
+        self.init_ui()
+        self.init_worker()
+        self.init_game()
+
+    def init_worker(self):
+        self.cpu_delay_ms = SPEEDS[0][1]
+        self.decision_token = 0
+        self.worker_thread = QThread(self)
+        self.worker = CpuWorker()
+        self.worker.moveToThread(self.worker_thread)
+        self.request_decision.connect(self.worker.decide)
+        self.worker.decided.connect(self.cpu_discard)
+        self.worker_thread.start()
+
+    def init_ui(self):
+        self.setWindowTitle("Pair & Follow")
+        self.setGeometry(100, 100, 900, 700)
+        self.setStyleSheet("""
+            QWidget { background-color: #2E8B57; }
+            QLabel { 
+                background-color: white;
+                border-radius: 8px;
+                padding: 5px;
+            }
+            QPushButton {
+                background-color: #FFD700;
+                border: 2px solid #8B4513;
+                border-radius: 5px;
+                padding: 8px;
+                font-weight: bold;
+            }
+            QPushButton:hover { background-color: #FFEC8B; }
+        """)
+
+        self.main_layout = QVBoxLayout()
+        self.setLayout(self.main_layout)
+
+        self.top_controls = QHBoxLayout()
+        self.new_game_btn = QPushButton("New Game")
+        self.new_game_btn.clicked.connect(self.new_game)
+        self.top_controls.addWidget(self.new_game_btn)
+        self.stats_label = QLabel("Wins: You (0) | CPU (0)")
+        self.top_controls.addWidget(self.stats_label)
+        self.speed_box = QComboBox()
+        self.speed_box.addItems([name for name, _ in SPEEDS])
+        self.speed_box.currentIndexChanged.connect(self.set_speed)
+        self.top_controls.addWidget(self.speed_box)
+        self.hint_box = QCheckBox("Hints")
+        self.hint_box.setChecked(True)
+        self.hint_box.toggled.connect(lambda _: self.update_hint())
+        self.top_controls.addWidget(self.hint_box)
+        self.top_controls.addStretch()
+        self.main_layout.addLayout(self.top_controls)
+
+        self.game_area = QHBoxLayout()
+        self.deck_pot_area = QVBoxLayout()
+        self.deck_label = QLabel("Deck\n(52)")
+        self.deck_label.setAlignment(Qt.AlignCenter)
+        self.deck_label.setFont(QFont('Arial', 16, QFont.Bold))
+        self.deck_label.setFixedSize(100, 150)
+        self.deck_label.setStyleSheet("""
+            background-color: #4169E1;
+            color: white;
+            border: 3px solid #000080;
+            border-radius: 10px;
+        """)
+        self.deck_pot_area.addWidget(self.deck_label)
+
+        self.pot_label = QLabel("Pot\n(0)")
+        self.pot_label.setAlignment(Qt.AlignCenter)
+        self.pot_label.setFont(QFont('Arial', 16, QFont.Bold))
+        self.pot_label.setFixedSize(100, 150)
+        self.pot_label.setStyleSheet("""
+            background-color: #DC143C;
+            color: white;
+            border: 3px solid #8B0000;
+            border-radius: 10px;
+        """)
+        self.deck_pot_area.addWidget(self.pot_label)
+        self.game_area.addLayout(self.deck_pot_area)
+        self.game_area.addStretch()
+
+        self.card_font = QFont('Arial', 24)
+        self.player_hand_area = QVBoxLayout()
+        # opponents scroll, so a big table keeps the window its size
+        self.cpu_area = QVBoxLayout()
+        self.cpu_rows = []
+        cpu_widget = QWidget()
+        cpu_widget.setLayout(self.cpu_area)
+        self.cpu_scroll = QScrollArea()
+        self.cpu_scroll.setWidgetResizable(True)
+        self.cpu_scroll.setWidget(cpu_widget)
+        self.player_hand_area.addWidget(self.cpu_scroll)
+        self.player_hand_label = QLabel("Your Hand")
+        self.player_hand_label.setFont(QFont('Arial', 12))
+        self.player_hand_label.setAlignment(Qt.AlignCenter)
+        self.player_hand_area.addWidget(self.player_hand_label)
+        self.hand_layout = QHBoxLayout()
+        self.hand_layout.setSpacing(10)
+        self.hand_slots = []
+        for idx in range(4):
+            label = self._card_label("", CARD_STYLES[False])
+            label.mousePressEvent = lambda event, idx=idx: self.discard_card(idx)
+            label.hide()
+            self.hand_layout.addWidget(label)
+            self.hand_slots.append(label)
+        self.shown_hand = [None] * 4
+        self.hand_red = [False] * 4
+        self.player_hand_area.addLayout(self.hand_layout)
+        self.game_area.addLayout(self.player_hand_area)
+        self.main_layout.addLayout(self.game_area)
+
+        self.status_label = QLabel("Welcome to Pair & Follow!")
+        self.status_label.setFont(QFont('Arial', 14, QFont.Bold))
+        self.status_label.setAlignment(Qt.AlignCenter)
+        self.main_layout.addWidget(self.status_label)
+        self.hint_label = QLabel("")
+        self.hint_label.setAlignment(Qt.AlignCenter)
+        self.main_layout.addWidget(self.hint_label)
+        self.shown_hint = ""
+
+        self.controls_layout = QHBoxLayout()
+        self.draw_button = QPushButton("Draw from Deck")
+        self.draw_button.clicked.connect(self.draw_card)
+        self.draw_button.setFixedWidth(200)
+        self.controls_layout.addWidget(self.draw_button)
+        self.main_layout.addLayout(self.controls_layout)
+
+    def init_game(self):
+        self.deck = None
+        self.pot = []
+        self.players = []
+        self.current_player_index = 0
+        self.game_active = False
+        self.has_drawn = False
+        self.shown_pot = None
+        self.pot_colour = None
+        self.shown_deck_count = None
+        self.shown_stats = None
+        self.ledger = None
+        self.cpu_level = CPU_LEVELS[0]
+        # thinking time per move and processes of the MCTS opponents
+        self.search_ms = mcts.BUDGET_MS
+        self.search_workers = 1
+        self.log = eventlog.open_default()
+        self.record = None
+        # game n of the session plays from the stream (master_seed, n)
+        self.master_seed = streams.master_seed()
+        self.games_started = 0
+        self.seed = None
+        self.rng = None
+        self.turns = 0
+        self.reshuffles = 0
+        self.first_seat = 0
+        self.positions = {}
+        # every finished game is counted here, and kept in $NJUKA_RESULTS if set
+        self.results = results.open_default()
+        self.totals = self.results.totals() if self.results else results.Aggregate()
+        self.new_game()
+
+    def set_speed(self, index):
+        self.cpu_delay_ms = SPEEDS[index][1]
+
+    def schedule_cpu_turn(self):
+        QTimer.singleShot(self.cpu_delay_ms, self.cpu_turn)
+
+    def new_game(self):
+        self.game_active = True
+        self.has_drawn = False
+        # drops any CPU decision still on its way from the previous game
+        self.decision_token += 1
+
+        try:
+            self.seed = streams.game_seed(self.master_seed, self.games_started)
+            self.games_started += 1
+            self.rng = streams.game_rng(self.master_seed, self.games_started - 1)
+            self.pot = []
+            self.turns = 0
+            self.reshuffles = 0
+            self.positions = {}
+
+            cpu_count, ok = QInputDialog.getInt(self, "CPU Players", f"Enter number of CPU opponents (1-{MAX_CPUS}):",
+                                                1, 1, MAX_CPUS)
+            if not ok:
+                return
+            self.deck = Deck(self.rng, decks_for(cpu_count + 1))
+
+            level, ok = QInputDialog.getItem(self, "CPU Level", "CPU opponents play:", CPU_LEVELS, CPU_LEVELS.index(self.cpu_level), False)
+            if not ok:
+                return
+            self.cpu_level = level
+            if level == "MCTS":
+                search_ms, ok = QInputDialog.getInt(self, "MCTS", "Thinking time per move (ms):",
+                                                    self.search_ms, 10, 10000)
+                if not ok:
+                    return
+                search_workers, ok = QInputDialog.getInt(self, "MCTS", "Processes per search:",
+                                                         self.search_workers, 1, os.cpu_count() or 1)
+                if not ok:
+                    return
+                self.search_ms, self.search_workers = search_ms, search_workers
+
+            self.players = [Player("You")] + [Player(f"CPU {i+1}") for i in range(cpu_count)]
+            self.load_wins()
+            self.ledger = invariants.ledger(len(self.players), self.deck.decks)
+
+            for _ in range(3):
+                for seat, player in enumerate(self.players):
+                    try:
+                        card = player.draw(self.deck)
+                        if not card:
+                            raise ValueError(f"Failed to deal card to {player.name}")
+                        if not self.book(card, invariants.DECK, seat):
+                            return
+                    except Exception as e:
+                        QMessageBox.critical(self, "Game Error", f"Failed to deal card: {str(e)}")
+                        self.game_active = False
+                        return
+            self.start_record()
+
+            self.current_player_index = self.rng.randrange(len(self.players))
+            self.first_seat = self.current_player_index
+            self.update_display()
+
+            # Check for win at start (in case it's possible)
+            winner = check_any_player_win(self.players, self.pot)
+            if winner:
+                self.show_winner(winner)
+                return
+
+            if self.current_player_index == 0:
+                self.status_label.setText("Your turn! Click 'Draw from Deck'")
+                self.draw_button.setEnabled(True)
+            else:
+                self.status_label.setText(f"{self.players[self.current_player_index].name}'s turn...")
+                self.draw_button.setEnabled(False)
+                self.schedule_cpu_turn()
+
+        except Exception as e:
+            QMessageBox.critical(self, "Game Error", f"Failed to start game: {str(e)}")
+            self.game_active = False
+
+    def update_display(self):
+        self.update_hand()
+        self.update_cpu_hand()
+        self.update_pot()
+        self.update_stats()
+        self.update_hint()
+
+    def update_hint(self):
+        text = ""
+        if self.hint_box.isChecked() and self.game_active and self.current_player_index == 0 and self.players:
+            hand = self.players[0].hand
+            ranks = [card.rank_index for card in hand]
+            position, chance = solver.hint(ranks, [card.rank_index for card in self.pot], rules='gui',
+                                           decks=self.deck.decks)
+            if position is None:
+                text = f"Hint: {chance:.1%} chance to win in your next {solver.HORIZON} draws"
+            else:
+                card = sorted(hand, key=lambda c: c.rank_index)[position]
+                text = f"Hint: throw {card.id} for a {chance:.1%} chance to win in your next {solver.HORIZON} draws"
+        if text != self.shown_hint:
+            self.shown_hint = text
+            self.hint_label.setText(text)
+
+    def update_hand(self):
+        # only the slots whose card changed are touched
+        hand = self.players[0].hand
+        for idx, label in enumerate(self.hand_slots):
+            card = hand[idx] if idx < len(hand) else None
+            shown = self.shown_hand[idx]
+            if card is shown:
+                continue
+            self.shown_hand[idx] = card
+            if card is None:
+                label.hide()
+                continue
+            label.setText(str(card))
+            red = card.suit in RED_SUITS
+            if red != self.hand_red[idx]:
+                label.setStyleSheet(CARD_STYLES[red])
+                self.hand_red[idx] = red
+            if shown is None:
+                label.show()
+
+    def _card_label(self, text, style):
+        label = QLabel(text)
+        label.setFont(self.card_font)
+        label.setAlignment(Qt.AlignCenter)
+        label.setFixedSize(80, 120)
+        label.setStyleSheet(style)
+        return label
+
+    def discard_card(self, index):
+        if not self.game_active or self.current_player_index != 0:
+            return
+        if not self.has_drawn:
+            QMessageBox.warning(self, "Invalid Move", "You must draw a card first!")
+            return
+        try:
+            discarded_card = self.players[0].discard(index)
+        except IndexError as e:
+            QMessageBox.warning(self, "Discard Error", str(e))
+            return
+        if discarded_card:
+            self.pot.append(discarded_card)
+            if not self.book(discarded_card, 0, invariants.POT):
+                return
+            self.log_event(eventlog.DISCARD, 0, discarded_card.code)
+            self.update_display()
+
+            # Check for win for any player after discard (including 3+pot cases)
+            winner = check_any_player_win(self.players, self.pot)
+            if winner:
+                self.show_winner(winner)
+                return
+
+            self.has_drawn = False
+            if self.count_turn():
+                return
+            self.current_player_index = (self.current_player_index + 1) % len(self.players)
+            if self.current_player_index == 0:
+                QMessageBox.critical(self, "BUG DETECTED", "Turn logic error: Player turn immediately after player turn.")
+                self.game_active = False
+            else:
+                self.status_label.setText(f"{self.players[self.current_player_index].name}'s turn...")
+                self.draw_button.setEnabled(False)
+                self.schedule_cpu_turn()
+
+    def update_cpu_hand(self):
+        cpus = self.players[1:]
+        while len(self.cpu_rows) < len(cpus):
+            row = CpuRow(self)
+            self.cpu_area.addWidget(row.widget)
+            self.cpu_rows.append(row)
+        for row, cpu in zip(self.cpu_rows, cpus):
+            row.show(cpu)
+        for row in self.cpu_rows[len(cpus):]:
+            row.hide()
+
+    def update_pot(self):
+        card = self.pot[-1] if self.pot else None
+        if card is not self.shown_pot:
+            self.shown_pot = card
+            self.pot_label.setText(f"Pot\n{str(card)}" if card else "Pot\n(0)")
+            colour = None if card is None else card.suit in RED_SUITS
+            if colour != self.pot_colour:
+                self.pot_label.setStyleSheet(POT_STYLES[colour])
+                self.pot_colour = colour
+        deck_count = len(self.deck.cards)
+        if deck_count != self.shown_deck_count:
+            self.shown_deck_count = deck_count
+            self.deck_label.setText(f"Deck\n({deck_count})")
+
+    def update_stats(self):
+        player_wins = self.players[0].wins
+        cpu_wins = sum(p.wins for p in self.players[1:])
+        text = f"Wins: You ({player_wins}) | CPU ({cpu_wins})"
+        if text != self.shown_stats:
+            self.shown_stats = text
+            self.stats_label.setText(text)
+
+    def draw_card(self):
+        if not self.game_active or self.current_player_index != 0:
+            return
+        if self.has_drawn:
+            QMessageBox.warning(self, "Invalid Move", "You can only draw one card per turn!")
+            return
+        if len(self.players[0].hand) >= 4:
+            QMessageBox.warning(self, "Hand Full", "You already have 4 cards! Discard one first.")
+            return
+        if self.deck.is_empty() and not self.recycle():
+            return
+        try:
+            drawn_card = self.players[0].draw(self.deck)
+        except Exception as e:
+            QMessageBox.critical(self, "Draw Error", f"Error drawing card: {str(e)}")
+            return
+        if drawn_card:
+            if not self.book(drawn_card, invariants.DECK, 0):
+                return
+            self.has_drawn = True
+            self.log_event(eventlog.DRAW, 0, drawn_card.code)
+            self.update_display()
+
+            # Check for win for any player after draw (including 3+pot cases)
+            winner = check_any_player_win(self.players, self.pot)
+            if winner:
+                self.show_winner(winner)
+            else:
+                self.status_label.setText("Select a card to discard")
+
+    def cpu_turn(self):
+        # nothing may have touched your hand since your turn
+        if self.game_active and not self.check_cards(0):
+            return
+        if self.current_player_index == 0:
+            QMessageBox.critical(self, "BUG DETECTED", "CPU turn called with current_player_index == 0. This should never happen!")
+            self.game_active = False
+            return
+        if not self.game_active:
+            return
+        cpu = self.players[self.current_player_index]
+        if len(cpu.hand) < 4 and self.deck.is_empty() and not self.recycle():
+            return
+        try:
+            if len(cpu.hand) < 4:
+                card = cpu.draw(self.deck)
+                if card:
+                    if not self.book(card, invariants.DECK, self.current_player_index):
+                        return
+                    self.log_event(eventlog.DRAW, self.current_player_index, card.code)
+                self.update_display()
+        except Exception as e:
+            QMessageBox.critical(self, "CPU Error", f"CPU draw error: {str(e)}")
+            self.game_active = False
+            return
+
+        # Check for win for any player after CPU draws (including 3+pot cases)
+        winner = check_any_player_win(self.players, self.pot)
+        if winner:
+            self.show_winner(winner)
+            return
+
+        if len(cpu.hand) == 4:
+            self.decision_token += 1
+            self.request_decision.emit(self.decision_token, self.cpu_decision(cpu))
+            return
+        self.end_cpu_turn()
+
+    def cpu_discard(self, token, discard_index):
+        if token != self.decision_token or not self.game_active:
+            return
+        cpu = self.players[self.current_player_index]
+        try:
+            if discard_index < 0:
+                raise ValueError("no discard was chosen")
+            discarded = cpu.discard(discard_index)
+            self.pot.append(discarded)
+            if not self.book(discarded, self.current_player_index, invariants.POT):
+                return
+            self.log_event(eventlog.DISCARD, self.current_player_index, discarded.code)
+            self.update_display()
+            # Check for win after discard
+            winner = check_any_player_win(self.players, self.pot)
+            if winner:
+                self.show_winner(winner)
+                return
+        except Exception as e:
+            QMessageBox.critical(self, "CPU Error", f"CPU discard error: {str(e)}")
+            self.game_active = False
+            return
+        self.end_cpu_turn()
+
+    def end_cpu_turn(self):
+        if self.count_turn():
+            return
+        self.current_player_index = (self.current_player_index + 1) % len(self.players)
+        if self.current_player_index == 0:
+            self.status_label.setText("Your turn! Click 'Draw from Deck'")
+            self.draw_button.setEnabled(True)
+            self.update_hint()
+        else:
+            self.status_label.setText(f"{self.players[self.current_player_index].name}'s turn...")
+            self.schedule_cpu_turn()
+
+    def recycle(self):
+        # everything in the pot but its top card goes back under the deck; False if the game ended
+        if len(self.pot) < 2:
+            self.end_drawn("No cards left!")
+            return False
+        seat = self.current_player_index
+        try:
+            self.deck.add_cards(self.pot[:-1])
+            if self.ledger is not None:
+                self.ledger.recycle(self.pot[-1].code)
+        except (ValueError, invariants.InvariantError) as e:
+            QMessageBox.critical(self, "Deck Error", f"Failed to reshuffle: {str(e)}")
+            self.game_active = False
+            return False
+        self.log_event(eventlog.RESHUFFLE, seat, len(self.pot) - 1)
+        self.reshuffles += 1
+        self.pot = [self.pot[-1]]
+        if not self.check_cards():
+            return False
+        self.update_display()
+        # the same hands at the same seat after a reshuffle: the game is going round in circles
+        position = zobrist.position_key([[card.code for card in p.hand] for p in self.players],
+                                        self.pot[0].code, [card.code for card in self.deck.cards], seat)
+        self.positions[position] = self.positions.get(position, 0) + 1
+        if self.positions[position] >= MAX_REPEATS:
+            self.end_drawn("The same hands keep coming back.")
+            return False
+        return True
+
+    def count_turn(self):
+        # True if the turn limit ended the game
+        self.turns += 1
+        if self.turns >= MAX_TURNS:
+            self.end_drawn(f"Nobody won in {MAX_TURNS} turns.")
+            return True
+        return False
+
+    def end_drawn(self, reason):
+        self.game_active = False
+        self.finish_record()
+        self.add_result(-1)
+        QMessageBox.information(self, "Game Over", f"The game is a draw. {reason}")
+        self.new_game()
+
+    def book(self, card, src, dst):
+        # moves a card in the ledger; False, after a BUG DETECTED dialog, if the cards stop adding up
+        if self.ledger is None:
+            return True
+        try:
+            self.ledger.move(card.code, src, dst)
+        except invariants.InvariantError as e:
+            return self.invariant_broken(e)
+        return self.check_cards(src, dst)
+
+    def check_cards(self, *seats):
+        # the hands at these seats against the ledger, and every card if it is paranoid
+        ledger = self.ledger
+        if ledger is None:
+            return True
+        try:
+            for seat in seats:
+                if seat >= 0:
+                    ledger.check_hand(seat, self.players[seat].hand)
+            if ledger.paranoid:
+                ledger.verify(self.deck.cards, [player.hand for player in self.players], self.pot)
+        except invariants.InvariantError as e:
+            return self.invariant_broken(e)
+        return True
+
+    def invariant_broken(self, error):
+        QMessageBox.critical(self, "BUG DETECTED", str(error))
+        self.game_active = False
+        return False
+
+    def cpu_decision(self, cpu):
+        # returns a function the worker thread can run; it only sees copies of the game state
+        if self.cpu_level != "MCTS":
+            # drawn here, so the game's stream is only ever used on the GUI thread
+            index = self.rng.randrange(4)
+            return lambda: index
+        if cpu.searcher is None:
+            cpu.searcher = mcts.Searcher(self.search_ms, self.search_workers, rules='gui',
+                                         seed=self.rng.getrandbits(64), decks=self.deck.decks)
+        searcher = cpu.searcher
+        ranks = [card.rank_index for card in cpu.hand]
+        order = sorted(range(len(ranks)), key=ranks.__getitem__)
+        seat = self.players.index(cpu)
+        hand_sizes = [len(p.hand) for p in self.players]
+        deck_size = len(self.deck.cards)
+        pot = [card.rank_index for card in self.pot]
+        return lambda: order[searcher.choose(ranks, seat, hand_sizes, deck_size, pot)]
+
+    def start_record(self):
+        # a game cut short (e.g. by a BUG DETECTED dialog) is kept with no winner
+        self.finish_record()
+        if self.log:
+            self.record = eventlog.GameRecord(self.seed, len(self.players), self.deck.decks)
+            for seat, player in enumerate(self.players):
+                self.record.deal(seat, player.hand)
+
+    def log_event(self, kind, seat, value):
+        if self.record:
+            self.record.add(kind, seat, value)
+
+    def finish_record(self):
+        if self.record:
+            self.log.write(self.record)
+            self.log.flush()
+            self.record = None
+
+    def table(self):
+        # the results table of this game: who sits at each seat
+        return ','.join(['Human'] + [self.cpu_level] * (len(self.players) - 1))
+
+    def load_wins(self):
+        for player, wins in zip(self.players, self.totals.wins(self.table())):
+            player.wins = wins
+
+    def add_result(self, winner):
+        if self.results:
+            self.results.append(self.table(), self.seed, winner, self.turns, self.reshuffles, self.first_seat)
+            # every game is written as it ends, so a crash loses none of the session
+            self.results.flush()
+        else:
+            self.totals.add_game(self.table(), winner, self.turns, self.reshuffles)
+        self.load_wins()
+
+    def closeEvent(self, event):
+        self.worker_thread.quit()
+        self.worker_thread.wait()
+        self.finish_record()
+        if self.results:
+            self.results.close()
+        super().closeEvent(event)
+
+    def show_winner(self, player):
+        # the card that completed the hand: the pot top for a 3-card hand, else the last draw
+        card = self.pot[-1] if len(player.hand) == 3 else player.hand[-1]
+        self.log_event(eventlog.WIN, self.players.index(player), card.code)
+        self.finish_record()
+        self.add_result(self.players.index(player))
+        message = f"{player.name} wins!\n\nFinal hands:\n"
+        for p in self.players:
+            message += f"{p.name}: {[str(c) for c in p.hand]}\n"
+        QMessageBox.information(self, "Game Over", message)
+        self.update_stats()
+        self.new_game()
+
+def main():
+    import instrument
+    stats_path = instrument.from_env()
+    app = QApplication(sys.argv)
+    game = Game()
+    game.show()
+    status = app.exec_()
+    if stats_path:
+        instrument.dump(stats_path)
+    sys.exit(status)
+
+if __name__ == '__main__':
+    main()
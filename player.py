@@ -1,202 +1,186 @@
 import random
+import mcts
+import render
+import solver
+from wintable import CLI_WIN, outs, pack
 
 class Player:
-    def __init__(self,player_name='cpu_player',level=None):
+    def __init__(self,player_name='cpu_player',level=None,search_ms=mcts.BUDGET_MS,search_workers=1):
         self.__player_name = player_name
         self.level = level
+        # thinking time per move and processes for level 'M'
+        self.search_ms = search_ms
+        self.search_workers = search_workers
         self.is_cpu = True if player_name == 'cpu_player' else False
         self.__hand = []
         self.__has_won = False
+        # ranks that would complete the hand while it holds 3 cards
+        self.outs = 0
+        self.searcher = None
         self.__ranks = ['A','2','3','4','5','6','7','8','9','10','J','Q','K']
- 
 
- 
+
+
     def print_cards(self):
-      
-                
-                # ASCII representation of each card
-                    card_lines = []
-                    for card in self.__hand:
-                        card_str = f"""
-    +-------+
-    | {card.get_rank():<2}    |
-    |  {card.get_suit()}    |
-    |    {card.get_rank():>2} |
-    +-------+
-    """
-                        card_lines.append(card_str.split('\n'))
-
-                # Initialize rows for each card
-                    num_rows = len(card_lines[0])
-                    rows = ['' for _ in range(num_rows)]
-                    print('Hand:\n')
-
-                            # Combine lines of each card horizontally
-                    for i in range(num_rows):
-                        for card in card_lines:
-                            rows[i] += card[i] + '  '  # Add space between cards
-
-                            # Print each row
-                    for row in rows:
-                        print(row)
+        # card art is cached in render; the whole hand goes out in one write
+        screen = render.default()
+        screen.hand(self.__hand)
+        screen.flush()
+
+    def has_winning_hand(self,hand=None):
+        hand = self.__hand if hand is None else hand
+        if len(hand) != 4:
+            return False
+        # hands are kept sorted, so the ranks pack straight into a table index
+        return CLI_WIN[pack([card.rank_index for card in hand])] == 1
 
     def draw(self,deck):
-            
-        new_card = deck.cards.pop(0)
+        # takes the top card of the deck and flags a win; returns the card
+        new_card = deck.draw()
         self.__hand.append(new_card)
-        self.__hand.sort()
-        if not self.is_cpu:
-            print(f'You drew a {new_card.get_rank()}')
-            self.print_cards()
-
-        if (self.__hand[0].get_rank() == self.__hand[1].get_rank() or self.__hand[2].get_rank() == self.__hand[3].get_rank()) and ((self.__ranks.index(self.__hand[0].get_rank()) == self.__ranks.index(self.__hand[1].get_rank()) - 1) or (self.__ranks.index(self.__hand[2].get_rank()) == self.__ranks.index(self.__hand[3].get_rank()) - 1)):
-
+        self.sort_hand()
+        if self.has_winning_hand():
             self.__has_won = True
-            self.print_cards()
-
-    def draw_card(self,deck,pot):
-        if len(self.__hand) == 3:
-            if len(deck.cards) == 0:
-                pot.pot_to_deck(deck)
-                self.draw(deck)
-            else:
-                 self.draw(deck)
-        else:
-            print('nope')
-            input()
+        return new_card
+
+    def draw_card(self,deck,pot,rng=random):
+        if len(self.__hand) != 3:
+            raise ValueError(f'{self.__player_name} must hold 3 cards to draw, not {len(self.__hand)}')
+        if deck.is_empty():
+            pot.pot_to_deck(deck,rng)
+        return self.draw(deck)
 
     def check_pot(self,players,card):
+        # returns the first other player whose hand is completed by card, or None
         for player in players:
-            if player.get_player_name() == self.__player_name:
+            if player is self:
                 continue
-            else:
-                player.give_hand(card)
-                player.sort_hand()
-                if (player.get_hand()[0].get_rank() == player.get_hand()[1].get_rank() or player.get_hand()[2].get_rank() == player.get_hand()[3].get_rank()) and ((self.__ranks.index(player.get_hand()[0].get_rank()) == self.__ranks.index(player.get_hand()[1].get_rank()) - 1) or (self.__ranks.index(player.get_hand()[2].get_rank()) == self.__ranks.index(player.get_hand()[3].get_rank()) - 1)):
-                    self.set_has_won()
-                    print(f'***{player.get_player_name()} has won with {card.get_rank()}***')
-                    print()
-                    player.print_cards()
-                    print('***GAME OVER***')
-                    exit()
-                else:
-                    player.delete_card(card)
-     
-    def player_throw_card(self,rank,pot,players):
-        ranks = ['A','2','3','4','5','6','7','8','9','10','J','Q','K']
-        if len(self.__hand) == 4 and rank.upper() in ranks:
-            for i, card in enumerate(self.__hand):
+            if player.outs >> card.rank_index & 1:
+                return player
+        return None
 
+    def player_throw_card(self,rank,pot):
+        if len(self.__hand) == 4 and rank.upper() in self.__ranks:
+            for i, card in enumerate(self.__hand):
                 if card.get_rank() == rank.upper():
-                    self.print_discarded(card)
                     pot.add_to_pot(card)
-                    self.check_pot(players,card)
                     del self.__hand[i]
-                    break
-        self.print_cards()
+                    self.update_outs()
+                    return card
+        return None
+
 
-        
-    def cpu_play(self,pot):
+    def cpu_play(self,pot,rng=random,game=None):
         if self.level.upper() == 'E':
-              self.cpu_throw_card(pot)
+              return self.cpu_throw_card(pot,rng)
         elif self.level.upper() == 'H':
-             self.cpu_throw_card_pro(pot)
+             return self.cpu_throw_card_pro(pot,rng)
+        elif self.level.upper() == 'O':
+             return self.cpu_throw_card_optimal(pot)
+        elif self.level.upper() == 'M':
+             return self.cpu_throw_card_mcts(pot,game)
+        elif self.level.upper() == 'L':
+             return self.cpu_throw_card_learned(pot)
         else:
-             print('Invalid level')
-    
+             raise ValueError(f'Invalid level: {self.level}')
+
     def print_discarded(self,card):
-         
-         card_str = f"""
-    +-------+
-    | {card.get_rank():<2}    |
-    |  {card.get_suit()}    |
-    |    {card.get_rank():>2} |
-    +-------+
-    """
-         print(card_str)
-
-    def cpu_throw_card(self,pot):
-
-        random_card = random.choice(self.__hand)
-        pot.add_to_pot(random_card)
-        print(f'{self.__player_name} throws card {random_card}')
-        self.__hand.remove(random_card)
-        print(f"{self.__player_name} is holding: {[card.__repr__() for card in self.__hand]}")
-        self.print_discarded(random_card)
-        input()
-
-    def delete_last_2_cards(self,pot):
-            random_card = random.choice(self.__hand[2:])
-            pot.add_to_pot(random_card)
-            print(f'{self.__player_name} throws card {random_card}')
-            self.print_discarded(random_card)
-            self.__hand.remove(random_card)
-            print(f"{self.__player_name} is holding: {[card.__repr__() for card in self.__hand]}")
-            input()
+        screen = render.default()
+        screen.discarded(card)
+        screen.flush()
+
+    def throw(self,card,pot):
+        pot.add_to_pot(card)
+        self.__hand.remove(card)
+        self.update_outs()
+        return card
+
+    def cpu_throw_card(self,pot,rng=random):
+        return self.throw(rng.choice(self.__hand),pot)
+
+    def delete_last_2_cards(self,pot,rng=random):
+        return self.throw(rng.choice(self.__hand[2:]),pot)
 
     #deletes one of the first 2 cards
-    def delete_first_2_cards(self,pot):
-            random_card = random.choice(self.__hand[:1])
-            pot.add_to_pot(random_card)
-            print(f'{self.__player_name} throws card {random_card}')
-            self.print_discarded(random_card)
-            self.__hand.remove(random_card)
-            print(f"{self.__player_name} is holding: {[card.__repr__() for card in self.__hand]}")
-            input()
+    def delete_first_2_cards(self,pot,rng=random):
+        return self.throw(rng.choice(self.__hand[:1]),pot)
 
     #deletes first or last card at random
-    def delete_2_center_cards(self,pot):
-            random_card = random.choice([self.__hand[0],self.__hand[0]])
-            pot.add_to_pot(random_card)
-            print(f'{self.__player_name} throws card {random_card}')
-            self.print_discarded
-            self.__hand.remove(random_card)
-            print(f"{self.__player_name} is holding: {[card.__repr__() for card in self.__hand]}")
-            input()
-
-    def cpu_throw_card_pro(self,pot):
-    
-        ranks = ['A','2','3','4','5','6','7','8','9','10','J','Q','K']
-        if self.__hand[0].get_rank() == self.__hand[1].get_rank(): 
-            self.delete_last_2_cards(pot)
-
-        elif self.__hand[2].get_rank() == self.__hand[3].get_rank():
-            self.delete_first_2_cards(pot)
-
-        elif self.__hand[1].get_rank() == self.__hand[2].get_rank():
-            self.delete_2_center_cards(pot)
-
-        elif (ranks.index(self.__hand[0].get_rank()) == ranks.index(self.__hand[1].get_rank()) - 1) and not (self.__hand[2].get_rank() == self.__hand[3].get_rank()):
-            self.delete_last_2_cards(pot)
-
-        elif (ranks.index(self.__hand[2].get_rank()) == ranks.index(self.__hand[3].get_rank()) - 1) and not (self.__hand[0].get_rank() == self.__hand[1].get_rank()):
-             self.delete_first_2_cards(pot)
-        elif (ranks.index(self.__hand[1].get_rank()) == ranks.index(self.__hand[2].get_rank()) - 1) and not (self.__hand[0].get_rank() == self.__hand[1].get_rank()) and not (self.__hand[2].get_rank() == self.__hand[3].get_rank()):
-             self.delete_2_center_cards(pot)
+    def delete_2_center_cards(self,pot,rng=random):
+        return self.throw(rng.choice([self.__hand[0],self.__hand[0]]),pot)
+
+    def cpu_throw_card_pro(self,pot,rng=random):
+
+        r0, r1, r2, r3 = [card.rank_index for card in self.__hand]
+        if r0 == r1:
+            return self.delete_last_2_cards(pot,rng)
+
+        elif r2 == r3:
+            return self.delete_first_2_cards(pot,rng)
+
+        elif r1 == r2:
+            return self.delete_2_center_cards(pot,rng)
+
+        elif r0 == r1 - 1 and not r2 == r3:
+            return self.delete_last_2_cards(pot,rng)
+
+        elif r2 == r3 - 1 and not r0 == r1:
+             return self.delete_first_2_cards(pot,rng)
+        elif r1 == r2 - 1 and not r0 == r1 and not r2 == r3:
+             return self.delete_2_center_cards(pot,rng)
         else:
-             self.cpu_throw_card(pot)
-          
+             return self.cpu_throw_card(pot,rng)
+
+
+    # throws the card the solver's policy table picks for this hand
+    def cpu_throw_card_optimal(self,pot):
+        slot = solver.policy()[pack([card.rank_index for card in self.__hand])]
+        return self.throw(self.__hand[slot],pot)
+
+    # throws the card the self-play policy picks, looked up in the memory-mapped table
+    def cpu_throw_card_learned(self,pot):
+        slot = solver.learned_policy()[pack([card.rank_index for card in self.__hand])]
+        return self.throw(self.__hand[slot],pot)
+
+    # searches the game as this player sees it: own hand, hand sizes, deck size and pot
+    def cpu_throw_card_mcts(self,pot,game):
+        if game is None:
+            return self.cpu_throw_card_optimal(pot)
+        if self.searcher is None:
+            self.searcher = mcts.Searcher(self.search_ms,self.search_workers,seed=game.rng.getrandbits(64),decks=game.deck.decks)
+        slot = self.searcher.choose([card.rank_index for card in self.__hand],
+                                    game.players.index(self),
+                                    [len(player.get_hand()) for player in game.players],
+                                    len(game.deck),
+                                    [card.rank_index for card in pot.get_cards()])
+        return self.throw(self.__hand[slot],pot)
 
     def __repr__(self):
         return f"{self.__player_name} is holding: {[card.__repr__() for card in self.__hand]}"
-    
+
     def __str__(self):
         return self.__player_name
-    
+
     def get_hand(self):
         return self.__hand
     def give_hand(self,card):
         self.__hand.append(card)
-    
+        self.update_outs()
+
     def get_has_won(self):
         return self.__has_won
-    
+
     def set_has_won(self):
          self.__has_won = True
     def get_player_name(self):
          return self.__player_name
     def sort_hand(self):
          self.__hand.sort()
+         self.update_outs()
 
     def delete_card(self,card):
-         self.__hand.remove(card)
\ No newline at end of file
+         self.__hand.remove(card)
+         self.update_outs()
+
+    def update_outs(self):
+         self.outs = outs([card.rank_index for card in self.__hand])
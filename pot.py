@@ -8,8 +8,16 @@ class Pot:
     def add_to_pot(self,card):
         self.__cards_in_pot.append(card)
 
-    def pot_to_deck(self,deck):
-        random.shuffle(self.__cards_in_pot)
-        deck.cards.extend(self.__cards_in_pot)
+    def pot_to_deck(self,deck,rng=random):
+        # the cards move to the deck; the pot starts again empty
+        deck.add_cards(self.__cards_in_pot,rng)
+        self.__cards_in_pot.clear()
 
-        pass
\ No newline at end of file
+    def get_cards(self):
+        return self.__cards_in_pot
+
+    def top(self):
+        return self.__cards_in_pot[-1] if self.__cards_in_pot else None
+
+    def __len__(self):
+        return len(self.__cards_in_pot)
@@ -0,0 +1,132 @@
+import sys
+import time
+from card import POOL
+
+"""
+Terminal rendering of cards.
+
+The ASCII art of all 52 cards is built once, as rows ready to be put side
+by side. A Renderer collects a frame into a buffer and writes it with a
+single stream write when flushed. With diff=True it keeps the frame on
+screen and repaints only the rows that changed, using ANSI cursor moves,
+which is what a terminal streaming many spectator tables needs.
+
+Diff mode assumes it owns the whole screen, so players print through a
+plain renderer: the CLI prints its own lines between their frames.
+spectate() is the full-screen view, of CPU games at several tables:
+
+    python render.py [tables] [frames]
+"""
+
+GAP = '  '
+
+def card_art(card):
+    return (
+        '',
+        '    +-------+',
+        f'    | {card.get_rank():<2}    |',
+        f'    |  {card.get_suit()}    |',
+        f'    |    {card.get_rank():>2} |',
+        '    +-------+',
+        '    ',
+    )
+
+# rows of each card with the gap to the next card, by card code
+ROWS = tuple(tuple(row + GAP for row in card_art(card)) for card in POOL)
+# a discarded card on its own
+ART = tuple('\n'.join(card_art(card)) for card in POOL)
+
+
+class Renderer:
+    def __init__(self, stream=None, diff=False, top=1):
+        self.stream = stream
+        self.diff = diff
+        self.top = top
+        self.lines = []
+        self.shown = []
+
+    def text(self, line=''):
+        self.lines.append(line)
+
+    def hand(self, cards, title='Hand:'):
+        lines = self.lines
+        if title is not None:
+            lines += (title, '')
+        lines += map(''.join, zip(*(ROWS[card.code] for card in cards)))
+
+    def discarded(self, card):
+        self.lines += ART[card.code].split('\n')
+
+    def frame(self):
+        if not self.diff:
+            return '\n'.join(self.lines) + '\n' if self.lines else ''
+        # only rows that differ from the shown frame, then clear what the old frame had below
+        out = []
+        shown = self.shown
+        for row, line in enumerate(self.lines):
+            if row >= len(shown) or shown[row] != line:
+                out.append(f'\x1b[{self.top + row};1H{line}\x1b[K')
+        for row in range(len(self.lines), len(shown)):
+            out.append(f'\x1b[{self.top + row};1H\x1b[K')
+        self.shown = self.lines[:]
+        return ''.join(out)
+
+    def flush(self):
+        frame = self.frame()
+        self.lines.clear()
+        if frame:
+            stream = self.stream or sys.stdout
+            stream.write(frame)
+            stream.flush()
+
+    def clear(self):
+        # forgets the shown frame, so the next diff flush repaints everything
+        self.shown = []
+        if self.diff:
+            (self.stream or sys.stdout).write('\x1b[2J')
+
+
+_default = None
+
+def default():
+    # the renderer players print through; plain, since the CLI prints between its frames
+    global _default
+    if _default is None:
+        _default = Renderer()
+    return _default
+
+
+def spectate(tables=4, seats=('E', 'H'), frames=None, delay=0.05, stream=None):
+    """Watches CPU games at several tables full-screen, a half turn per table per frame."""
+    from engine import Engine
+    from player import Player
+
+    def start():
+        nonlocal played
+        played += 1
+        game = Engine([Player(level=level) for level in seats], seed=played)
+        game.deal()
+        return game
+
+    played = 0
+    games = [start() for _ in range(tables)]
+    renderer = Renderer(stream, diff=True)
+    renderer.clear()
+    frame = 0
+    while frames is None or frame < frames:
+        for t, game in enumerate(games):
+            if game.over:
+                game = games[t] = start()
+            else:
+                game.step()
+            player = game.current_player()
+            renderer.hand(player.get_hand(), f'Table {t + 1}, game {game.seed}, turn {game.turns}: '
+                                             f'seat {game.players.index(player) + 1} ({player.level}) holds')
+        renderer.flush()
+        frame += 1
+        if delay:
+            time.sleep(delay)
+
+
+if __name__ == '__main__':
+    spectate(int(sys.argv[1]) if len(sys.argv) > 1 else 4, frames=int(sys.argv[2]) if len(sys.argv) > 2 else None)
@@ -0,0 +1,348 @@
+import argparse
+import json
+import os
+import time
+import numpy as np
+
+"""
+Columnar store of game results, and streaming aggregates over it.
+
+A store is a directory holding one row per game in segments. Every segment
+is a set of .npy files, one per column, and meta.json lists the finished
+segments and the tables (the CPU level of every seat, joined by commas,
+e.g. 'E,H') that the table column indexes:
+
+    seed        uint64  the game's seed
+    table       uint16  index into meta.json's tables
+    first       uint8   the seat that moved first
+    winner      int8    winning seat, -1 for a draw
+    turns       uint32  turns played
+    reshuffles  uint32  times the pot went back into the deck
+
+Rows are buffered and written a segment at a time; meta.json is replaced
+last, so a store that is read while a run appends to it, or whose writer
+died, only ever shows whole segments. A store made with segment_rows=None
+is only written when flush() is called, for writers such as a resumable
+tournament that must keep it in step with their own checkpoints.
+truncate() drops the rows past a count such a checkpoint recorded.
+
+Aggregate reads the columns through memory maps a chunk at a time, so win
+rates by seat and level, game length histograms and reshuffle counts come
+out of any number of games in bounded memory.
+
+    python results.py runs/ --add 1000000 --seats E,H
+    python results.py runs/
+
+Setting $NJUKA_RESULTS to a directory makes the Qt frontend write each of
+its games there as it ends and count its players' wins from it.
+"""
+
+COLUMNS = {
+    'seed': np.uint64,
+    'table': np.uint16,
+    'first': np.uint8,
+    'winner': np.int8,
+    'turns': np.uint32,
+    'reshuffles': np.uint32,
+}
+META_FILE = 'meta.json'
+VERSION = 1
+SEGMENT_ROWS = 1 << 20
+CHUNK_ROWS = 1 << 20
+RESULTS_ENV = 'NJUKA_RESULTS'
+# the largest seat an int8 winner column holds
+MAX_SEATS = 127
+
+
+class Aggregate:
+    """Running totals per table: games, wins by seat, draws, and histograms of turns and reshuffles."""
+
+    def __init__(self):
+        self.tables = {}
+
+    def table(self, levels):
+        totals = self.tables.get(levels)
+        if totals is None:
+            seats = len(levels.split(','))
+            totals = self.tables[levels] = {
+                'games': 0,
+                'wins': np.zeros(seats, dtype=np.int64),
+                'draws': 0,
+                'turns': np.zeros(0, dtype=np.int64),
+                'reshuffles': np.zeros(0, dtype=np.int64),
+            }
+        return totals
+
+    def add_game(self, levels, winner, turns, reshuffles):
+        totals = self.table(levels)
+        totals['games'] += 1
+        if winner < 0:
+            totals['draws'] += 1
+        else:
+            totals['wins'][winner] += 1
+        totals['turns'] = add_counts(totals['turns'], np.bincount([turns]))
+        totals['reshuffles'] = add_counts(totals['reshuffles'], np.bincount([reshuffles]))
+
+    def add_rows(self, tables, table, winner, turns, reshuffles):
+        """Adds a chunk of rows; tables maps the table column's values to level strings."""
+        for index in np.unique(table):
+            rows = table == index
+            totals = self.table(tables[index])
+            won = winner[rows]
+            draws = won < 0
+            totals['games'] += len(won)
+            totals['draws'] += int(draws.sum())
+            totals['wins'] += np.bincount(won[~draws], minlength=len(totals['wins']))
+            totals['turns'] = add_counts(totals['turns'], np.bincount(turns[rows]))
+            totals['reshuffles'] = add_counts(totals['reshuffles'], np.bincount(reshuffles[rows]))
+
+    def merge(self, other):
+        for levels, theirs in other.tables.items():
+            totals = self.table(levels)
+            totals['games'] += theirs['games']
+            totals['wins'] += theirs['wins']
+            totals['draws'] += theirs['draws']
+            totals['turns'] = add_counts(totals['turns'], theirs['turns'])
+            totals['reshuffles'] = add_counts(totals['reshuffles'], theirs['reshuffles'])
+
+    def games(self):
+        return sum(totals['games'] for totals in self.tables.values())
+
+    def wins(self, levels):
+        # wins by seat at one table, zeros if it was never played
+        return self.table(levels)['wins'].tolist() if levels in self.tables else [0] * len(levels.split(','))
+
+    def win_rates(self, levels):
+        totals = self.tables.get(levels)
+        if not totals or not totals['games']:
+            return [0.0] * len(levels.split(','))
+        return (totals['wins'] / totals['games']).tolist()
+
+    def by_level(self):
+        """{level: (seats played, wins)} over every table; a game counts once per seat a level held."""
+        levels = {}
+        for table, totals in self.tables.items():
+            for seat, level in enumerate(table.split(',')):
+                played, wins = levels.get(level, (0, 0))
+                levels[level] = (played + totals['games'], wins + int(totals['wins'][seat]))
+        return levels
+
+    def histogram(self, column, levels=None):
+        # counts of games by turns or reshuffles, at one table or all of them
+        tables = [self.tables[levels]] if levels else self.tables.values()
+        counts = np.zeros(0, dtype=np.int64)
+        for totals in tables:
+            counts = add_counts(counts, totals[column])
+        return counts
+
+    def reshuffle_frequency(self, levels=None):
+        """(share of games with a reshuffle, mean reshuffles per game)."""
+        counts = self.histogram('reshuffles', levels)
+        games = counts.sum()
+        if not games:
+            return 0.0, 0.0
+        return 1 - counts[0] / games, float(np.arange(len(counts)) @ counts / games)
+
+    def to_dict(self):
+        return {table: {'games': totals['games'], 'wins': totals['wins'].tolist(), 'draws': totals['draws'],
+                        'turns': totals['turns'].tolist(), 'reshuffles': totals['reshuffles'].tolist()}
+                for table, totals in sorted(self.tables.items())}
+
+
+def add_counts(a, b):
+    # sums two bincounts of different lengths
+    if len(a) < len(b):
+        a, b = b, a
+    a = a.copy()
+    a[:len(b)] += b
+    return a
+
+def percentile(counts, q):
+    # the value at fraction q of a histogram
+    total = np.cumsum(counts)
+    return int(np.searchsorted(total, q * total[-1])) if len(total) and total[-1] else 0
+
+
+class ResultsStore:
+    def __init__(self, path, segment_rows=SEGMENT_ROWS):
+        self.path = path
+        self.segment_rows = segment_rows
+        os.makedirs(path, exist_ok=True)
+        meta = os.path.join(path, META_FILE)
+        if os.path.exists(meta):
+            with open(meta) as f:
+                self.meta = json.load(f)
+            if self.meta['version'] != VERSION:
+                raise ValueError(f"{path} holds results of version {self.meta['version']}")
+        else:
+            self.meta = {'version': VERSION, 'tables': [], 'segments': []}
+        self.table_ids = {levels: index for index, levels in enumerate(self.meta['tables'])}
+        self.buffer = {name: [] for name in COLUMNS}
+        self.buffered = 0
+        # totals over the store, read on first use and kept up to date by appends
+        self._totals = None
+
+    def table_id(self, levels):
+        levels = levels if isinstance(levels, str) else ','.join(levels)
+        index = self.table_ids.get(levels)
+        if index is None:
+            if len(levels.split(',')) > MAX_SEATS:
+                raise ValueError(f'Results cover tables of at most {MAX_SEATS} seats')
+            index = self.table_ids[levels] = len(self.meta['tables'])
+            self.meta['tables'].append(levels)
+        return index
+
+    def append(self, levels, seed, winner, turns, reshuffles, first=0):
+        """Adds one game; winner is a seat or -1 for a draw."""
+        table = self.table_id(levels)
+        for name, value in zip(COLUMNS, (seed, table, first, winner, turns, reshuffles)):
+            self.buffer[name].append(value)
+        self.buffered += 1
+        if self._totals is not None:
+            self._totals.add_game(self.meta['tables'][table], winner, turns, reshuffles)
+        if self.segment_rows and self.buffered >= self.segment_rows:
+            self.flush()
+
+    def extend(self, levels, seeds, winners, turns, reshuffles, first=0):
+        """Adds a batch of games at one table, given as arrays."""
+        n = len(seeds)
+        table = self.table_id(levels)
+        columns = (seeds, np.full(n, table), np.broadcast_to(first, n), winners, turns, reshuffles)
+        for (name, dtype), values in zip(COLUMNS.items(), columns):
+            self.buffer[name].append(np.asarray(values, dtype=dtype))
+        self.buffered += n
+        if self._totals is not None:
+            self._totals.add_rows(self.meta['tables'], np.full(n, table), np.asarray(winners, dtype=np.int8),
+                                  np.asarray(turns, dtype=np.int64), np.asarray(reshuffles, dtype=np.int64))
+        if self.segment_rows and self.buffered >= self.segment_rows:
+            self.flush()
+
+    def flush(self):
+        if not self.buffered:
+            return
+        segment = f"{len(self.meta['segments']):05d}"
+        for name, dtype in COLUMNS.items():
+            values = np.concatenate([np.atleast_1d(np.asarray(part, dtype=dtype)) for part in self.buffer[name]])
+            tmp = os.path.join(self.path, f'{segment}.{name}.tmp.npy')
+            np.save(tmp, values)
+            os.replace(tmp, os.path.join(self.path, f'{segment}.{name}.npy'))
+            self.buffer[name] = []
+        self.meta['segments'].append({'name': segment, 'rows': self.buffered})
+        self.buffered = 0
+        self.write_meta()
+
+    def write_meta(self):
+        tmp = os.path.join(self.path, META_FILE + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self.meta, f)
+        os.replace(tmp, os.path.join(self.path, META_FILE))
+
+    def truncate(self, rows):
+        """Drops every written row after the first rows, and any buffered ones."""
+        self.buffer = {name: [] for name in COLUMNS}
+        self.buffered = 0
+        self._totals = None
+        kept, dropped, total = [], [], 0
+        for segment in self.meta['segments']:
+            if total >= rows:
+                dropped.append(segment)
+                continue
+            if total + segment['rows'] > rows:
+                # the segment the cut falls in is rewritten with its first rows only
+                keep = rows - total
+                for name in COLUMNS:
+                    path = os.path.join(self.path, f"{segment['name']}.{name}.npy")
+                    tmp = os.path.join(self.path, f"{segment['name']}.{name}.tmp.npy")
+                    np.save(tmp, np.load(path)[:keep])
+                    os.replace(tmp, path)
+                segment = dict(segment, rows=keep)
+            kept.append(segment)
+            total += segment['rows']
+        self.meta['segments'] = kept
+        self.write_meta()
+        for segment in dropped:
+            for name in COLUMNS:
+                os.remove(os.path.join(self.path, f"{segment['name']}.{name}.npy"))
+
+    def close(self):
+        self.flush()
+
+    def rows(self):
+        return sum(segment['rows'] for segment in self.meta['segments']) + self.buffered
+
+    def chunks(self, columns=tuple(COLUMNS), chunk_rows=CHUNK_ROWS):
+        """Yields dicts of column arrays, at most chunk_rows long, over the written segments."""
+        for segment in self.meta['segments']:
+            arrays = {name: np.load(os.path.join(self.path, f"{segment['name']}.{name}.npy"), mmap_mode='r')
+                      for name in columns}
+            for start in range(0, segment['rows'], chunk_rows):
+                yield {name: array[start:start + chunk_rows] for name, array in arrays.items()}
+
+    def aggregate(self, chunk_rows=CHUNK_ROWS):
+        """Totals over the written segments, read a chunk at a time."""
+        totals = Aggregate()
+        tables = self.meta['tables']
+        for chunk in self.chunks(('table', 'winner', 'turns', 'reshuffles'), chunk_rows):
+            totals.add_rows(tables, chunk['table'], chunk['winner'], chunk['turns'], chunk['reshuffles'])
+        return totals
+
+    def totals(self):
+        """Totals over every game in the store, buffered ones included; kept up to date by append()."""
+        if self._totals is None:
+            self._totals = self.aggregate()
+            buffered = self.buffer
+            if self.buffered:
+                parts = {name: np.concatenate([np.atleast_1d(part) for part in buffered[name]])
+                         for name in ('table', 'winner', 'turns', 'reshuffles')}
+                self._totals.add_rows(self.meta['tables'], parts['table'], parts['winner'].astype(np.int8),
+                                      parts['turns'], parts['reshuffles'])
+        return self._totals
+
+
+def open_default():
+    # the store named by $NJUKA_RESULTS, if any
+    path = os.environ.get(RESULTS_ENV)
+    return ResultsStore(path) if path else None
+
+
+def report(totals):
+    lines = []
+    for table, result in sorted(totals.tables.items()):
+        games = result['games']
+        turns = result['turns']
+        mean = np.arange(len(turns)) @ turns / games
+        lines.append(f"{table}: {games} games, {result['draws']} drawn, turns mean {mean:.1f}, "
+                     f"median {percentile(turns, 0.5)}, p99 {percentile(turns, 0.99)}")
+        rates = ', '.join(f'{rate:.1%}' for rate in totals.win_rates(table))
+        share, mean = totals.reshuffle_frequency(table)
+        lines.append(f"  wins by seat {rates}; reshuffled in {share:.1%} of games, {mean:.2f} per game")
+    for level, (played, wins) in sorted(totals.by_level().items()):
+        lines.append(f"level {level}: {wins / played:.1%} of {played} seats won")
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Summarize, or add games to, a results store.')
+    parser.add_argument('path', help='the store directory')
+    parser.add_argument('--add', type=int, metavar='N', help='first play N games with the batch simulator')
+    parser.add_argument('--seats', default='E,H', help='CPU level per seat for --add, e.g. E,H')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    store = ResultsStore(args.path)
+    if args.add:
+        import batch
+        start = time.perf_counter()
+        seats = [level.upper() for level in args.seats.split(',')]
+        # games are numbered on from those already stored, so repeated --add runs never replay a seed
+        first = store.rows()
+        for offset in range(0, args.add, SEGMENT_ROWS):
+            batch.simulate(min(SEGMENT_ROWS, args.add - offset), seats, args.seed, start=first + offset, results=store)
+        store.close()
+        print(f'added {args.add} games in {time.perf_counter() - start:.1f}s')
+    start = time.perf_counter()
+    totals = store.aggregate()
+    print(report(totals))
+    print(f'aggregated {totals.games()} games in {time.perf_counter() - start:.2f}s')
+
+if __name__ == '__main__':
+    main()
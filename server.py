@@ -0,0 +1,256 @@
+import argparse
+import asyncio
+import json
+import streams
+import zobrist
+from engine import Engine, DEAL, DRAW, DISCARD, RESHUFFLE, WIN, END
+from player import Player
+
+"""
+Multi-table game server over the headless engine.
+
+Clients speak line-delimited JSON over TCP or a Unix socket. Requests:
+
+    {"op": "join", "table": "t1", "name": "ann", "humans": 2, "cpus": ["E", "H"]}
+    {"op": "draw"}
+    {"op": "discard", "rank": "7"}
+    {"op": "leave"}
+
+humans and cpus only matter to whoever creates the table; the game starts
+once every human seat is taken, CPU seats after the humans. The server
+answers with events, cards being int codes (rank_index * 4 + suit_index):
+
+    {"event": "joined", "table": "t1", "seat": 0, "players": 4}
+    {"event": "deal", "seat": 0, "hand": [4, 17, 50]}   hand only to its owner
+    {"event": "turn", "seat": 1, "phase": "draw"}
+    {"event": "draw", "seat": 1, "card": 9}             card only to its owner
+    {"event": "discard", "seat": 1, "card": 9}
+    {"event": "reshuffle", "seat": 1}
+    {"event": "win", "seat": 2, "card": 9}
+    {"event": "end", "seat": 0}                         the game is drawn
+    {"event": "closed", "table": "t1"}                  a human left mid-game,
+                                                        or the table failed
+    {"event": "error", "message": "..."}
+
+CPU turns run as tasks that yield to the event loop after every half turn;
+levels that search ('M') think in the default executor. Engine events are
+queued and written out from the event loop once the step that raised them
+has returned.
+"""
+
+SLOW_LEVELS = ('M',)
+# the engine's repetition keys cover zobrist.MAX_SEATS seats; the shoe grows with the table
+MAX_PLAYERS = zobrist.MAX_SEATS
+
+
+def send(writer, message):
+    if writer is not None and not writer.is_closing():
+        writer.write(json.dumps(message, separators=(',', ':')).encode() + b'\n')
+
+
+class Table:
+    def __init__(self, name, humans, cpus, seed=None):
+        self.name = name
+        self.humans = humans
+        self.cpus = [level.upper() for level in cpus]
+        self.seed = seed
+        self.writers = [None] * humans
+        self.names = [None] * humans
+        self.game = None
+        self.outbox = []
+        self.running = False
+        self.closed = False
+        # the task playing the CPU seats, kept so that its failure is not lost
+        self.task = None
+
+    def join(self, writer, name):
+        if None not in self.writers:
+            raise ValueError(f'Table {self.name} is full')
+        seat = self.writers.index(None)
+        self.writers[seat] = writer
+        self.names[seat] = name or f'player {seat + 1}'
+        send(writer, {'event': 'joined', 'table': self.name, 'seat': seat, 'players': self.humans + len(self.cpus)})
+        if None not in self.writers:
+            self.start()
+        return seat
+
+    def leave(self, seat):
+        self.writers[seat] = None
+        if self.game is not None and not self.game.over:
+            self.broadcast({'event': 'closed', 'table': self.name})
+            self.flush()
+        if self.game is not None or not any(self.writers):
+            self.closed = True
+
+    def start(self):
+        players = [Player(name) for name in self.names]
+        for player in players:
+            # a client may pick any name, including the one Player reserves for CPUs
+            player.is_cpu = False
+        players += [Player(level=level) for level in self.cpus]
+        self.game = Engine(players, seed=self.seed, listener=self.on_event)
+        self.game.deal()
+        self.flush()
+        self.advance()
+
+    def broadcast(self, message, owner=None, private=None):
+        self.outbox.append((message, owner, private))
+
+    def flush(self):
+        # private fields only go to the seat that owns them
+        outbox, self.outbox = self.outbox, []
+        for message, owner, private in outbox:
+            for seat, writer in enumerate(self.writers):
+                send(writer, dict(message, **private) if private and seat == owner else message)
+
+    def on_event(self, event, player, card):
+        seat = self.game.players.index(player)
+        message = {'event': event, 'seat': seat}
+        if event == DEAL:
+            self.broadcast(message, seat, {'hand': [c.code for c in player.get_hand()]})
+        elif event == DRAW:
+            self.broadcast(message, seat, {'card': card.code})
+        elif event in (DISCARD, WIN):
+            self.broadcast(dict(message, card=card.code))
+        elif event in (RESHUFFLE, END):
+            self.broadcast(message)
+        if event in (WIN, END):
+            self.closed = True
+
+    def advance(self):
+        if not self.running and not self.closed:
+            self.running = True
+            self.task = asyncio.get_running_loop().create_task(self.play_cpus())
+
+    async def play_cpus(self):
+        game = self.game
+        loop = asyncio.get_running_loop()
+        try:
+            while not game.over and not self.closed and game.current_player().is_cpu:
+                player = game.current_player()
+                if game.phase == DISCARD and player.level.upper() in SLOW_LEVELS:
+                    await loop.run_in_executor(None, game.step)
+                    self.flush()
+                else:
+                    game.step()
+                    self.flush()
+                    await asyncio.sleep(0)
+            if not game.over and not self.closed:
+                self.broadcast({'event': 'turn', 'seat': game.turn, 'phase': game.phase})
+                self.flush()
+        except Exception as e:
+            self.fail(e)
+        finally:
+            self.running = False
+
+    def fail(self, error):
+        # the game cannot go on: everyone is told, and the table closes
+        self.outbox.clear()
+        self.broadcast({'event': 'error', 'message': f'The table failed: {error}'})
+        self.broadcast({'event': 'closed', 'table': self.name})
+        self.flush()
+        self.closed = True
+
+    def move(self, seat, request):
+        game = self.game
+        if self.closed:
+            raise ValueError(f'Table {self.name} is closed')
+        if game is None or game.over:
+            raise ValueError('The game is not running')
+        if self.running or game.turn != seat:
+            raise ValueError('It is not your turn')
+        if request['op'] == 'draw':
+            game.draw()
+        else:
+            game.apply_move(str(request.get('rank', '')).upper())
+        if not game.over:
+            if game.current_player().is_cpu:
+                self.advance()
+            else:
+                self.broadcast({'event': 'turn', 'seat': game.turn, 'phase': game.phase})
+        self.flush()
+
+
+class Server:
+    def __init__(self, seed=None):
+        self.tables = {}
+        self.seed = streams.master_seed() if seed is None else seed
+        self.created = 0
+
+    def table(self, request):
+        name = str(request.get('table', ''))
+        table = self.tables.get(name)
+        if table is None or table.closed:
+            humans = int(request.get('humans', 1))
+            cpus = request.get('cpus', ['E'])
+            if humans < 1 or not 2 <= humans + len(cpus) <= MAX_PLAYERS:
+                raise ValueError(f'A table needs 1 or more humans and 2 to {MAX_PLAYERS} players')
+            # table n plays the game seeded by (server seed, n), so a session can be replayed
+            table = self.tables[name] = Table(name, humans, cpus, streams.game_seed(self.seed, self.created))
+            self.created += 1
+        return table
+
+    async def handle(self, reader, writer):
+        table, seat = None, None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    op = request.get('op')
+                    if op == 'join':
+                        if table is not None and not table.closed:
+                            raise ValueError('Leave your table first')
+                        table = self.table(request)
+                        seat = table.join(writer, request.get('name'))
+                    elif op in ('draw', 'discard'):
+                        if table is None:
+                            raise ValueError('Join a table first')
+                        table.move(seat, request)
+                    elif op == 'leave':
+                        if table is not None:
+                            table.leave(seat)
+                        table, seat = None, None
+                    else:
+                        raise ValueError(f'Unknown op: {op}')
+                except (ValueError, KeyError, TypeError, AttributeError) as e:
+                    send(writer, {'event': 'error', 'message': str(e)})
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            if table is not None:
+                table.leave(seat)
+            writer.close()
+
+    def prune(self):
+        for name in [name for name, table in self.tables.items() if table.closed]:
+            del self.tables[name]
+
+    async def serve(self, host='127.0.0.1', port=8765, path=None):
+        if path:
+            server = await asyncio.start_unix_server(self.handle, path)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            while True:
+                await asyncio.sleep(10)
+                self.prune()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Host many game tables in one process.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help='listen on this Unix socket path instead of TCP')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+    try:
+        asyncio.run(Server(args.seed).serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+import mmap
+import os
+from functools import lru_cache
+from itertools import combinations_with_replacement
+from wintable import CLI_OUTS, GUI_OUTS, pack, pack3
+
+"""
+Expectimax discard solver for the CLI rules.
+
+After drawing, a player holds 4 cards and throws one away. best_discard()
+picks the card that maximizes the chance of drawing a winning hand within
+the next k draws, averaging over the ranks still unseen (52 cards minus
+the hand and any dead cards the caller knows about, e.g. the pot) and
+choosing the best discard again after every draw that does not win.
+
+build_policy() runs the solver for every 4-card rank multiset and stores
+the answer in a 64K table indexed by wintable code, holding the position
+of the card to throw in the sorted hand. save_policy()/load_policy() keep
+it in POLICY_FILE; policy() is what the 'O' CPU level reads. policy('gui')
+is the same table for the Qt window's rules, built in memory when asked for. The 'L' level
+reads a table of the same shape learned by train.py, from LEARNED_FILE,
+which has a fixed 8-byte header so that it can be mapped straight into
+memory and shared by every process through the page cache.
+
+hint() answers the same question for a live game, with the pot and any
+other dead cards taken out of the unseen ranks, for the CLI rules or the
+Qt window's ('gui'). The solver works on rank counts and the outs masks of
+wintable; its caches are bounded, so it can run every turn at every table.
+"""
+
+HORIZON = 2
+POLICY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'policy.bin')
+MAGIC = b'NJKP'
+NO_MOVE = 255
+LEARNED_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'learned.bin')
+LEARNED_MAGIC = b'NJKQ'
+LEARNED_VERSION = 1
+LEARNED_HEADER = 8
+CACHE_SIZE = 1 << 16
+
+# for every 3-card code, the ranks that complete the hand, by rules
+OUT_RANKS = {
+    rules: [tuple(r for r in range(13) if mask >> r & 1) for mask in table]
+    for rules, table in (('cli', CLI_OUTS), ('gui', GUI_OUTS))
+}
+
+def discard_outs(out_ranks):
+    # for every 4-card code, the outs left by each distinct discard
+    options = {}
+    for hand in combinations_with_replacement(range(13), 4):
+        options[pack(hand)] = tuple({out_ranks[pack3(hand[:i] + hand[i + 1:])] for i in range(4)})
+    return options
+
+DISCARD_OUTS = {rules: discard_outs(out_ranks) for rules, out_ranks in OUT_RANKS.items()}
+
+def unseen(ranks, dead=(), decks=1):
+    counts = [4 * decks] * 13
+    for r in ranks:
+        counts[r] -= 1
+    for r in dead:
+        counts[r] -= 1
+    if min(counts) < 0:
+        raise ValueError(f'More than {4 * decks} cards of one rank are accounted for')
+    return tuple(counts)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def win_chance(hand, counts, k, rules='cli'):
+    # chance that a sorted 3-card hand wins within k draws from counts
+    total = sum(counts)
+    if k == 0 or total == 0:
+        return 0.0
+    wins = OUT_RANKS[rules][pack3(hand)]
+    chance = sum(counts[r] for r in wins)
+    if k == 2 and total > 1:
+        # the last draw inlined: count the outs of the best discard, all in whole numbers
+        options = DISCARD_OUTS[rules]
+        chance *= total - 1
+        for r, c in enumerate(counts):
+            if c and r not in wins:
+                best = 0
+                for left in options[pack(sorted(hand + (r,)))]:
+                    n = sum(counts[w] for w in left) - (r in left)
+                    if n > best:
+                        best = n
+                chance += c * best
+        return chance / (total * (total - 1))
+    if k > 2:
+        for r, c in enumerate(counts):
+            if c and r not in wins:
+                after = counts[:r] + (c - 1,) + counts[r + 1:]
+                chance += c * choose(tuple(sorted(hand + (r,))), after, k - 1, rules)[1]
+    return chance / total
+
+def choose(hand, counts, k, rules='cli'):
+    # best (position, chance) for a sorted 4-card hand; equal ranks share an answer
+    best = (0, -1.0)
+    for i, r in enumerate(hand):
+        if i and hand[i - 1] == r:
+            continue
+        chance = win_chance(hand[:i] + hand[i + 1:], counts, k, rules)
+        if chance > best[1]:
+            best = (i, chance)
+    return best
+
+def best_discard(ranks, dead=(), k=HORIZON):
+    """Returns (position in the sorted hand, win chance within k draws) for the best discard."""
+    hand = tuple(sorted(ranks))
+    return choose(hand, unseen(hand, dead), k)
+
+def hint(ranks, pot=(), dead=(), k=HORIZON, rules='cli', decks=1):
+    """The exact chance of drawing a winning hand within k draws, and how to get it.
+
+    ranks is the hand, pot and dead the ranks of cards known to be out of the
+    deck, which is a shoe of decks decks. Returns (position in the sorted
+    hand of the card to throw, chance) for a 4-card hand and (None, chance)
+    for a 3-card hand waiting to draw.
+    """
+    hand = tuple(sorted(ranks))
+    counts = unseen(hand, tuple(pot) + tuple(dead), decks)
+    if len(hand) == 4:
+        return choose(hand, counts, k, rules)
+    if len(hand) == 3:
+        return None, win_chance(hand, counts, k, rules)
+    raise ValueError(f'A hint needs 3 or 4 cards, not {len(hand)}')
+
+
+def build_policy(k=HORIZON, rules='cli'):
+    table = bytearray([NO_MOVE]) * (1 << 16)
+    for hand in combinations_with_replacement(range(13), 4):
+        table[pack(hand)] = choose(hand, unseen(hand), k, rules)[0]
+    win_chance.cache_clear()
+    return table
+
+def save_policy(table, path=POLICY_FILE, k=HORIZON):
+    with open(path, 'wb') as f:
+        f.write(MAGIC + bytes([k]) + bytes(table))
+
+def load_policy(path=POLICY_FILE):
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:4] != MAGIC or len(data) != 5 + (1 << 16):
+        raise ValueError(f'{path} is not a policy table')
+    return data[5:]
+
+_policies = {}
+
+def policy(rules='cli'):
+    # loaded once per process; built in memory if the file has not been generated
+    table = _policies.get(rules)
+    if table is None:
+        if rules == 'cli' and os.path.exists(POLICY_FILE):
+            table = load_policy()
+        else:
+            table = build_policy(rules=rules)
+        _policies[rules] = table
+    return table
+
+
+def save_learned(table, path=LEARNED_FILE):
+    if len(table) != 1 << 16:
+        raise ValueError('A policy table has 65536 entries')
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(LEARNED_MAGIC + bytes([LEARNED_VERSION, 0, 0, 0]) + bytes(table))
+    os.replace(tmp, path)
+
+def map_learned(path=LEARNED_FILE):
+    # a read-only view of the file's table; pages are only read as hands look them up
+    with open(path, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if data[:4] != LEARNED_MAGIC or data[4] != LEARNED_VERSION or len(data) != LEARNED_HEADER + (1 << 16):
+        data.close()
+        raise ValueError(f'{path} is not a learned policy table')
+    return memoryview(data)[LEARNED_HEADER:]
+
+_learned = None
+
+def learned_policy():
+    # mapped once per process; the solver's table stands in until train.py has written one
+    global _learned
+    if _learned is None:
+        _learned = map_learned() if os.path.exists(LEARNED_FILE) else policy()
+    return _learned
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+    k = int(sys.argv[1]) if len(sys.argv) > 1 else HORIZON
+    start = time.perf_counter()
+    table = build_policy(k)
+    save_policy(table, k=k)
+    print(f'wrote {POLICY_FILE} (k={k}) in {time.perf_counter() - start:.1f}s')
@@ -0,0 +1,68 @@
+import os
+import random
+
+"""
+Per-game random streams derived from a master seed.
+
+The seed of game i under a master seed is output i of a SplitMix64
+generator keyed by the master: a counter run through a 64-bit mixing
+function. Any game's seed is computed directly from (master, i) with no
+state carried from game to game, so a batch can be split across processes
+in any way and a single game re-run on its own. Different indexes under
+one master never share a seed, and every seed fits the 64 bits an event
+log header stores. A game's random.Random is seeded with it.
+
+Batch does the same over NumPy arrays for the vectorized simulator: row r
+of a batch starting at game index start has the seed of game start + r and
+draws 64-bit words from its own counter, so bulk shuffles and per-row
+choices do not depend on which other games share the batch.
+"""
+
+GOLDEN = 0x9E3779B97F4A7C15
+MASK64 = (1 << 64) - 1
+SEED_ENV = 'NJUKA_SEED'
+
+
+def mix(z):
+    # the SplitMix64 output function, a bijection on 64-bit ints
+    z = (z ^ (z >> 30)) * 0xBF58476D1CE4E5B9 & MASK64
+    z = (z ^ (z >> 27)) * 0x94D049BB133111EB & MASK64
+    return z ^ (z >> 31)
+
+def game_seed(master, index):
+    """The 64-bit seed of game index under master."""
+    return mix((mix(master & MASK64) + (index + 1) * GOLDEN) & MASK64)
+
+def game_rng(master, index):
+    return random.Random(game_seed(master, index))
+
+def master_seed():
+    # $NJUKA_SEED if set, so that a session can be replayed, else a fresh one
+    seed = os.environ.get(SEED_ENV)
+    return int(seed) & MASK64 if seed else random.getrandbits(64)
+
+
+class Batch:
+    def __init__(self, master, start, n_games):
+        import numpy as np
+        self.np = np
+        index = np.arange(start, start + n_games, dtype=np.uint64)
+        self.keys = self.mix(np.uint64(mix(master & MASK64)) + (index + np.uint64(1)) * np.uint64(GOLDEN))
+        self.counters = np.zeros(n_games, dtype=np.uint64)
+
+    def mix(self, z):
+        np = self.np
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return z ^ (z >> np.uint64(31))
+
+    def words(self, rows, k=1):
+        """(len(rows), k) random 64-bit words, the next k of every row's stream."""
+        np = self.np
+        steps = self.counters[rows, None] + np.arange(1, k + 1, dtype=np.uint64)
+        self.counters[rows] += np.uint64(k)
+        return self.mix(self.keys[rows, None] + self.mix(steps * np.uint64(GOLDEN)))
+
+    def permutations(self, rows, size):
+        """A uniform random permutation of range(size) for every row."""
+        return self.np.argsort(self.words(rows, size), axis=1)
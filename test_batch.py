@@ -0,0 +1,16 @@
+import batch
+from deck import decks_for
+
+"""
+The vectorised simulator against the engine, on samples small enough to run often.
+"""
+
+
+def test_two_seats_match_the_engine():
+    assert batch.cross_check(n_games=5000, seats=('E', 'H'), seed=1) <= 4.0
+
+
+def test_a_shoe_of_several_decks_matches_the_engine():
+    seats = ('E', 'H') * 10
+    assert decks_for(len(seats)) == 2
+    assert batch.cross_check(n_games=3000, seats=seats, seed=2) <= 4.0
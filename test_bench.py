@@ -0,0 +1,19 @@
+import bench
+
+"""
+The import budget of the rules module, measured as `bench.py --imports` does.
+
+The budget here is four times the bench's, so that a loaded machine does not
+fail the suite; loading Qt at all fails it everywhere.
+"""
+
+
+def test_rules_import_without_qt_within_budget():
+    cost = bench.import_cost(runs=3)
+    assert 'PyQt5' not in cost['modules']
+    assert bench.import_problems(cost, 4 * bench.IMPORT_BUDGET_MS, 4 * bench.IMPORT_BUDGET_KB) == []
+
+
+def test_loading_qt_is_a_problem():
+    cost = {'module': bench.IMPORT_MODULE, 'ms': 0.0, 'rss_kb': 0, 'modules': ['PyQt5', 'card']}
+    assert bench.import_problems(cost) == [f'importing {bench.IMPORT_MODULE} loaded PyQt5']
@@ -0,0 +1,25 @@
+import pytest
+
+from card import Card, POOL, RANKS, SUITS
+
+"""
+Interned cards and how they are looked up.
+"""
+
+
+def test_cards_are_interned():
+    for rank in RANKS:
+        for suit in SUITS:
+            card = Card(rank, suit)
+            assert card is Card(rank, suit) is POOL[card.code]
+            assert (card.get_rank(), card.get_suit()) == (rank, suit)
+
+
+def test_no_suit_is_hearts():
+    assert Card('7') is Card('7', '♥')
+
+
+@pytest.mark.parametrize('suit', ['x', '', 'hearts', 'H'])
+def test_unknown_suits_are_refused(suit):
+    with pytest.raises(ValueError):
+        Card('7', suit)
@@ -0,0 +1,63 @@
+import io
+
+import bench
+import render
+from card import POOL
+
+"""
+The renderer against the per-row prints it replaced, and its diff mode.
+"""
+
+
+def test_hands_print_as_before():
+    for cards in bench.random_hands(50, 4, seed=8) + bench.random_hands(5, 3, seed=9):
+        old, new = io.StringIO(), io.StringIO()
+        bench.legacy_hand(cards, old)
+        renderer = render.Renderer(new)
+        renderer.hand(cards)
+        renderer.flush()
+        assert new.getvalue() == old.getvalue()
+
+
+def test_discards_print_as_before():
+    for card in POOL:
+        old, new = io.StringIO(), io.StringIO()
+        # Player.print_discarded before render
+        card_str = f"""
+    +-------+
+    | {card.get_rank():<2}    |
+    |  {card.get_suit()}    |
+    |    {card.get_rank():>2} |
+    +-------+
+    """
+        print(card_str, file=old)
+        renderer = render.Renderer(new)
+        renderer.discarded(card)
+        renderer.flush()
+        assert new.getvalue() == old.getvalue()
+
+
+def test_diff_mode_repaints_changed_rows_only():
+    out = io.StringIO()
+    renderer = render.Renderer(out, diff=True)
+    renderer.text('same')
+    renderer.text('old')
+    renderer.text('gone')
+    renderer.flush()
+    out.truncate(0)
+    out.seek(0)
+    renderer.text('same')
+    renderer.text('new')
+    renderer.flush()
+    assert out.getvalue() == '\x1b[2;1Hnew\x1b[K\x1b[3;1H\x1b[K'
+
+
+def test_players_print_plain():
+    assert not render.default().diff
+
+
+def test_spectate_repaints_in_place():
+    out = io.StringIO()
+    render.spectate(tables=2, frames=30, delay=0, stream=out)
+    assert out.getvalue().startswith('\x1b[2J')
+    assert 'Table 2' in out.getvalue()
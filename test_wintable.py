@@ -0,0 +1,88 @@
+from itertools import combinations_with_replacement, permutations
+
+import pytest
+
+import njuka_working
+import wintable
+from card import Card, RANKS, SUITS
+from player import Player
+
+"""
+The win tables against the win checks they replaced, on every rank multiset.
+
+baseline_cli_win and baseline_gui_win are the predicates of player.py and
+njuka_working.py as they were before the tables, copied verbatim; they take
+the same cards as the current code.
+"""
+
+HANDS = list(combinations_with_replacement(range(13), 4))
+TRIPLES = list(combinations_with_replacement(range(13), 3))
+
+
+def baseline_cli_win(hand):
+    # Player.draw / Player.check_pot, on the hand sorted as they sorted it
+    ranks = ['A','2','3','4','5','6','7','8','9','10','J','Q','K']
+    hand = sorted(hand)
+    return bool((hand[0].get_rank() == hand[1].get_rank() or hand[2].get_rank() == hand[3].get_rank()) and ((ranks.index(hand[0].get_rank()) == ranks.index(hand[1].get_rank()) - 1) or (ranks.index(hand[2].get_rank()) == ranks.index(hand[3].get_rank()) - 1)))
+
+
+def baseline_gui_win(cards):
+    # njuka_working.is_winning_combination
+    values_idx = [card.value_index for card in cards]
+    value_counts = {}
+    for v in values_idx:
+        value_counts[v] = value_counts.get(v, 0) + 1
+    pairs = [v for v, count in value_counts.items() if count == 2]
+    if len(pairs) != 1:
+        return False
+    pair_value = pairs[0]
+    # Remove both pair cards
+    remaining = [v for v in values_idx if v != pair_value]
+    if len(remaining) != 2:
+        remaining = [v for v in values_idx if v != pair_value or (v == pair_value and values_idx.count(v) > 2)]
+    remaining = sorted(remaining)
+    if len(remaining) != 2:
+        return False
+    diff = remaining[1] - remaining[0]
+    # Ace and 2 wraparound
+    return diff == 1 or remaining == [1, 2]
+
+
+def cards(ranks):
+    # one card per rank, repeated ranks in different suits
+    return [Card(RANKS[r], SUITS[ranks[:i].count(r)]) for i, r in enumerate(ranks)]
+
+
+@pytest.mark.parametrize('ranks', HANDS, ids=lambda ranks: '-'.join(RANKS[r] for r in ranks))
+def test_four_card_hands(ranks):
+    hand = cards(ranks)
+    player = Player('p1')
+    assert player.has_winning_hand(sorted(hand)) == baseline_cli_win(hand)
+    for order in set(permutations(hand)):
+        assert njuka_working.is_winning_combination(list(order)) == baseline_gui_win(list(order))
+
+
+def test_outs_complete_three_card_hands():
+    for ranks in TRIPLES:
+        hand = cards(ranks)
+        for r in range(13):
+            top = Card(RANKS[r], SUITS[3])
+            assert wintable.outs(ranks, wintable.CLI_OUTS) >> r & 1 == baseline_cli_win(hand + [top])
+            assert wintable.outs(ranks, wintable.GUI_OUTS) >> r & 1 == baseline_gui_win(hand + [top])
+
+
+def test_other_sizes_never_win():
+    assert not Player('p1').has_winning_hand(cards((0, 0, 1)))
+    assert wintable.outs((0, 0)) == 0
+    assert wintable.outs((0, 0, 1, 1)) == 0
+
+
+def test_rules_disagree_on_three_of_a_kind_next_to_a_single():
+    expected = []
+    for low in range(12):
+        expected += [[RANKS[low]] * 3 + [RANKS[low + 1]], [RANKS[low]] + [RANKS[low + 1]] * 3]
+    assert wintable.disagreements() == expected
+    for hand in expected:
+        ranks = [RANKS.index(rank) for rank in hand]
+        assert baseline_cli_win(cards(ranks)) and not baseline_gui_win(cards(ranks))
+    assert sum(wintable.CLI_WIN) - sum(wintable.GUI_WIN) == len(expected)
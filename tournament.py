@@ -0,0 +1,200 @@
+import argparse
+import json
+import math
+import os
+import time
+from multiprocessing import Pool
+import invariants
+import mcts
+from engine import Engine
+from player import Player
+from results import ResultsStore
+from streams import game_seed
+
+"""
+Tournament of CPU levels over the headless engine.
+
+Each matchup (one level letter per seat, e.g. E,H) is split into chunks of
+seeded games that run on a process pool and stream back as they finish.
+Game i of a matchup always uses the same seed, so results do not depend
+on the number of workers, and finished chunks are checkpointed to a JSON
+file so a long run can be stopped and resumed. With a results store, every
+game also comes back as a row and is appended to it, a segment at a time.
+With a checkpoint as well, the store is only written when the checkpoint
+is saved; the checkpoint records the store's row count, and a resumed run
+first truncates the store to it, so no game is stored twice.
+
+search_ms and search_workers set the thinking time per move and the
+processes of the 'M' level. A search cannot start processes from inside
+a pool worker, so searches over several processes need workers=1, which
+plays every chunk in this process.
+"""
+
+DEFAULT_MATCHUPS = ['E,H', 'H,E', 'H,H', 'E,E,H', 'E,H,E', 'H,E,E', 'E,H,H']
+
+
+def play_chunk(task):
+    # rows, if asked for, are the seed, winning seat (-1 for none), turns and reshuffles of every game
+    matchup, seed, start, count, keep_rows, search_ms, search_workers = task
+    seats = matchup.split(',')
+    wins = [0] * len(seats)
+    draws = 0
+    turns = 0
+    rows = [] if keep_rows else None
+    checks = invariants.default_level(invariants.OFF)
+    for index in range(start, start + count):
+        players = [Player(level=level, search_ms=search_ms, search_workers=search_workers) for level in seats]
+        game = Engine(players, seed=game_seed(seed, index), checks=checks)
+        game.deal()
+        winner = game.play()
+        seat = -1 if winner is None else players.index(winner)
+        if winner is None:
+            draws += 1
+        else:
+            wins[seat] += 1
+        turns += game.turns
+        if keep_rows:
+            rows.append((game.seed, seat, game.turns, game.reshuffles))
+    return matchup, start, wins, draws, turns, rows
+
+
+def wilson(wins, games, z=1.96):
+    # 95% Wilson score interval for a win rate
+    if games == 0:
+        return 0.0, 1.0
+    p = wins / games
+    centre = (p + z * z / (2 * games)) / (1 + z * z / games)
+    half = z * math.sqrt(p * (1 - p) / games + z * z / (4 * games * games)) / (1 + z * z / games)
+    return centre - half, centre + half
+
+
+class Tournament:
+    def __init__(self, matchups, games, seed=0, chunk=500, checkpoint=None, results=None,
+                 search_ms=mcts.BUDGET_MS, search_workers=1):
+        self.matchups = matchups
+        self.games = games
+        self.seed = seed
+        self.chunk = chunk
+        self.checkpoint = checkpoint
+        self.store = results
+        if checkpoint and results is not None:
+            # rows reach the disk with the checkpoint that knows about them
+            results.segment_rows = None
+        self.search_ms = search_ms
+        self.search_workers = search_workers
+        self.results = {m: {'games': 0, 'wins': [0] * len(m.split(',')), 'draws': 0, 'turns': 0, 'done': []}
+                        for m in matchups}
+        if checkpoint and os.path.exists(checkpoint):
+            self.load()
+
+    def load(self):
+        with open(self.checkpoint) as f:
+            saved = json.load(f)
+        if saved['seed'] != self.seed or saved['chunk'] != self.chunk:
+            raise ValueError(f'{self.checkpoint} was written with a different seed or chunk size')
+        for matchup, result in saved['results'].items():
+            if matchup in self.results:
+                self.results[matchup] = result
+        if self.store is not None and 'rows' in saved:
+            # rows written after the checkpoint belong to chunks that will be played again
+            self.store.truncate(saved['rows'])
+
+    def save(self):
+        if self.store is not None:
+            self.store.flush()
+        tmp = self.checkpoint + '.tmp'
+        with open(tmp, 'w') as f:
+            saved = {'seed': self.seed, 'chunk': self.chunk, 'results': self.results}
+            if self.store is not None:
+                saved['rows'] = self.store.rows()
+            json.dump(saved, f)
+        os.replace(tmp, self.checkpoint)
+
+    def tasks(self):
+        for matchup in self.matchups:
+            done = set(self.results[matchup]['done'])
+            for start in range(0, self.games, self.chunk):
+                if start not in done:
+                    yield (matchup, self.seed, start, min(self.chunk, self.games - start), self.store is not None,
+                           self.search_ms, self.search_workers)
+
+    def add(self, matchup, start, wins, draws, turns, rows=None):
+        if rows:
+            seeds, winners, lengths, reshuffles = zip(*rows)
+            self.store.extend(matchup, seeds, winners, lengths, reshuffles)
+        result = self.results[matchup]
+        result['games'] += sum(wins) + draws
+        result['wins'] = [a + b for a, b in zip(result['wins'], wins)]
+        result['draws'] = result.get('draws', 0) + draws
+        result['turns'] += turns
+        result['done'].append(start)
+
+    def run(self, workers=None, save_every=20, progress=None):
+        tasks = list(self.tasks())
+        if self.search_workers > 1 and workers != 1:
+            raise ValueError('Searches over several processes need a tournament of one worker')
+        if workers == 1:
+            self.collect(map(play_chunk, tasks), len(tasks), save_every, progress)
+        else:
+            with Pool(workers) as pool:
+                self.collect(pool.imap_unordered(play_chunk, tasks), len(tasks), save_every, progress)
+        if self.checkpoint:
+            self.save()
+        elif self.store is not None:
+            self.store.flush()
+        return self.results
+
+    def collect(self, chunks, total, save_every, progress):
+        for i, done in enumerate(chunks, 1):
+            self.add(*done)
+            if self.checkpoint and i % save_every == 0:
+                self.save()
+            if progress:
+                progress(i, total)
+
+    def report(self):
+        lines = []
+        for matchup in self.matchups:
+            result = self.results[matchup]
+            games = result['games']
+            if not games:
+                continue
+            lines.append(f"{matchup}: {games} games, {result['turns'] / games:.1f} turns per game")
+            if result.get('draws'):
+                lines.append(f"  drawn: {result['draws']}")
+            for seat, level in enumerate(matchup.split(',')):
+                wins = result['wins'][seat]
+                low, high = wilson(wins, games)
+                lines.append(f"  seat {seat + 1} ({level}): {wins / games:6.1%}  [{low:.1%}, {high:.1%}]")
+        return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Play CPU levels against each other on all cores.')
+    parser.add_argument('matchups', nargs='*', default=DEFAULT_MATCHUPS, help='levels per seat, e.g. E,H or H,H,E')
+    parser.add_argument('-n', '--games', type=int, default=10000, help='games per matchup')
+    parser.add_argument('-w', '--workers', type=int, default=None, help='worker processes (default: all cores)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk', type=int, default=500, help='games per task sent to a worker')
+    parser.add_argument('--checkpoint', help='JSON file to save progress to and resume from')
+    parser.add_argument('--results', metavar='DIR', help='also append every game to this results store')
+    parser.add_argument('--search-ms', type=int, default=mcts.BUDGET_MS, help="thinking time per move of level 'M'")
+    parser.add_argument('--search-workers', type=int, default=1,
+                        help="processes per search of level 'M' (needs --workers 1)")
+    args = parser.parse_args()
+    if args.search_workers > 1 and args.workers != 1:
+        parser.error('--search-workers above 1 needs --workers 1')
+
+    matchups = [m.upper() for m in args.matchups]
+    store = ResultsStore(args.results) if args.results else None
+    tournament = Tournament(matchups, args.games, args.seed, args.chunk, args.checkpoint, store,
+                            args.search_ms, args.search_workers)
+    start = time.perf_counter()
+    tournament.run(args.workers, progress=lambda i, n: print(f'\r{i}/{n} chunks', end='', flush=True))
+    elapsed = time.perf_counter() - start
+    print()
+    print(tournament.report())
+    print(f'{elapsed:.1f}s')
+
+if __name__ == '__main__':
+    main()
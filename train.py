@@ -0,0 +1,167 @@
+import argparse
+import os
+import time
+import numpy as np
+import solver
+import streams
+from mcts import discard, draw, outs_for
+from wintable import CLI_WIN, pack
+
+"""
+Self-play Q-learning of a discard policy for the CLI rules.
+
+The state is the sorted 4-card hand after a draw (its wintable code, the
+same abstraction as the solver's policy table) and the action is the
+position of the card to throw. Every seat plays the current policy,
+epsilon-greedy, in games of ranks only (the simulation of mcts.py). The
+reward is 1 for winning, so Q(s, a) learns the chance of winning after
+throwing a from s.
+
+Updates are batched: a batch of games is played with the Q table frozen,
+then every (state, action) visited in it moves alpha of the way towards the
+mean of its targets. The Q table and the batch count are checkpointed to
+an .npz file, from which training resumes, and the greedy policy is
+written as solver's learned policy file, which Player level 'L' maps.
+"""
+
+BATCH = 2000
+ALPHA = 0.2
+EPSILON = 0.1
+CHECKPOINT_FILE = 'train_checkpoint.npz'
+MAX_TURNS = 400
+
+
+def legal(hand):
+    # positions of distinct ranks in a sorted hand
+    return [i for i in range(4) if not i or hand[i] != hand[i - 1]]
+
+
+class Trainer:
+    def __init__(self, players=2, seed=0, alpha=ALPHA, epsilon=EPSILON, checkpoint=None):
+        self.players = players
+        self.seed = seed
+        self.alpha = alpha
+        self.epsilon = epsilon
+        self.checkpoint = checkpoint
+        self.q = np.zeros((1 << 16, 4))
+        self.visits = np.zeros((1 << 16, 4), dtype=np.int64)
+        self.games = 0
+        self.outs = outs_for(CLI_WIN)
+        if checkpoint and os.path.exists(checkpoint):
+            self.load()
+
+    def load(self):
+        with np.load(self.checkpoint) as saved:
+            if int(saved['seed']) != self.seed or int(saved['players']) != self.players:
+                raise ValueError(f'{self.checkpoint} was written with a different seed or table size')
+            self.q = saved['q']
+            self.visits = saved['visits']
+            self.games = int(saved['games'])
+
+    def save(self):
+        tmp = self.checkpoint + '.tmp.npz'
+        np.savez(tmp, q=self.q, visits=self.visits, games=self.games, seed=self.seed, players=self.players)
+        os.replace(tmp, self.checkpoint)
+
+    def play(self, index, q):
+        """Plays game index with q frozen; returns its (state, action, next state or -1, reward) steps."""
+        rng = streams.game_rng(self.seed, index)
+        deck = [r for r in range(13) for _ in range(4)]
+        rng.shuffle(deck)
+        hands = [sorted(deck[3 * seat:3 * seat + 3]) for seat in range(self.players)]
+        del deck[:3 * self.players]
+        pot = []
+        history = [[] for _ in range(self.players)]
+        winner, seat = -1, 0
+        for _ in range(MAX_TURNS):
+            hand = draw(hands, deck, pot, seat, rng)
+            code = pack(hand)
+            if CLI_WIN[code]:
+                winner = seat
+                break
+            moves = legal(hand)
+            if rng.random() < self.epsilon:
+                slot = rng.choice(moves)
+            else:
+                values = q[code]
+                slot = max(moves, key=values.__getitem__)
+            history[seat].append((code, slot))
+            winner = discard(hands, pot, seat, slot, self.outs)
+            if winner >= 0:
+                break
+            seat = (seat + 1) % self.players
+        steps = []
+        for seat, moves in enumerate(history):
+            for t, (code, slot) in enumerate(moves):
+                if t + 1 < len(moves):
+                    steps.append((code, slot, moves[t + 1][0], 0.0))
+                else:
+                    steps.append((code, slot, -1, 1.0 if seat == winner else 0.0))
+        return steps
+
+    def batch(self, size=BATCH):
+        q = self.q
+        steps = []
+        for index in range(self.games, self.games + size):
+            steps += self.play(index, q)
+        self.games += size
+        if not steps:
+            return 0
+        state, action, following, reward = (np.array(column) for column in zip(*steps))
+        # the next decision's value under the greedy policy; terminal steps only get their reward
+        best = np.where(following >= 0, q[np.maximum(following, 0)].max(axis=1), 0.0)
+        target = reward + best
+        flat = state * 4 + action
+        counts = np.bincount(flat, minlength=q.size)
+        sums = np.bincount(flat, weights=target, minlength=q.size)
+        seen = counts > 0
+        values = q.reshape(-1)
+        values[seen] += self.alpha * (sums[seen] / counts[seen] - values[seen])
+        self.visits.reshape(-1)[seen] += counts[seen]
+        return len(steps)
+
+    def policy(self):
+        """The greedy policy as a 64K table; hands never visited keep the solver's choice."""
+        table = bytearray(solver.policy())
+        visited = np.flatnonzero(self.visits.sum(axis=1))
+        for code in visited:
+            hand = [code & 15, code >> 4 & 15, code >> 8 & 15, code >> 12 & 15]
+            table[code] = max(legal(hand), key=lambda i: (self.visits[code, i] > 0, self.q[code, i]))
+        return table
+
+    def run(self, batches, checkpoint_every=10, progress=None):
+        for i in range(1, batches + 1):
+            steps = self.batch()
+            if self.checkpoint and i % checkpoint_every == 0:
+                self.save()
+            if progress:
+                progress(i, steps)
+        if self.checkpoint:
+            self.save()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Learn a discard policy by self-play.')
+    parser.add_argument('-b', '--batches', type=int, default=100)
+    parser.add_argument('--players', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--alpha', type=float, default=ALPHA)
+    parser.add_argument('--epsilon', type=float, default=EPSILON)
+    parser.add_argument('--checkpoint', default=CHECKPOINT_FILE, help='resume from and save to this file')
+    parser.add_argument('--checkpoint-every', type=int, default=10, help='batches between checkpoints')
+    parser.add_argument('-o', '--output', default=solver.LEARNED_FILE, help='where to write the learned policy')
+    args = parser.parse_args()
+    trainer = Trainer(args.players, args.seed, args.alpha, args.epsilon, args.checkpoint)
+    start, first = time.perf_counter(), trainer.games
+
+    def progress(i, steps):
+        if i % 10 == 0 or i == args.batches:
+            rate = (trainer.games - first) / (time.perf_counter() - start)
+            print(f'batch {i}/{args.batches}: {trainer.games} games, {steps} updates, {rate:.0f} games/s')
+
+    trainer.run(args.batches, args.checkpoint_every, progress)
+    solver.save_learned(trainer.policy(), args.output)
+    print(f'wrote {args.output}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+from itertools import combinations_with_replacement
+from card import RANKS, RANK_INDEX
+
+"""
+Precomputed win tables for 4-card hands.
+
+A hand is packed into a 16 bit code holding its sorted rank indexes
+(0 = A ... 12 = K) one per nibble, lowest rank in the lowest nibble.
+CLI_WIN and GUI_WIN hold 1 at every code that wins under the rules of
+player.py and njuka_working.py respectively, so a win check is one index.
+
+CLI_OUTS and GUI_OUTS do the same for 3-card hands (12 bit codes): each
+entry is a 13 bit mask of the ranks that would complete the hand, so
+checking whether a discard completes someone's hand is one bit test.
+"""
+
+
+def pack(ranks):
+    # ranks must already be sorted
+    return ranks[0] | ranks[1] << 4 | ranks[2] << 8 | ranks[3] << 12
+
+def hand_code(ranks):
+    return pack(sorted(ranks))
+
+def pack3(ranks):
+    return ranks[0] | ranks[1] << 4 | ranks[2] << 8
+
+def unpack(code):
+    return [code & 15, code >> 4 & 15, code >> 8 & 15, code >> 12 & 15]
+
+
+def cli_rule(ranks):
+    # Player.draw/check_pot: a pair at one end of the sorted hand and a run of two at either end
+    h = sorted(ranks)
+    return (h[0] == h[1] or h[2] == h[3]) and (h[0] == h[1] - 1 or h[2] == h[3] - 1)
+
+def gui_rule(ranks):
+    # is_winning_combination: exactly one pair plus two consecutive ranks, ranks counted from 1
+    values_idx = [r + 1 for r in ranks]
+    value_counts = {}
+    for v in values_idx:
+        value_counts[v] = value_counts.get(v, 0) + 1
+    pairs = [v for v, count in value_counts.items() if count == 2]
+    if len(pairs) != 1:
+        return False
+    pair_value = pairs[0]
+    remaining = [v for v in values_idx if v != pair_value]
+    if len(remaining) != 2:
+        remaining = [v for v in values_idx if v != pair_value or (v == pair_value and values_idx.count(v) > 2)]
+    remaining = sorted(remaining)
+    if len(remaining) != 2:
+        return False
+    diff = remaining[1] - remaining[0]
+    # Ace and 2 wraparound
+    return diff == 1 or remaining == [1, 2]
+
+
+def build(rule):
+    table = bytearray(1 << 16)
+    for ranks in combinations_with_replacement(range(13), 4):
+        if rule(ranks):
+            table[pack(ranks)] = 1
+    return table
+
+def build_outs(win):
+    outs = [0] * (1 << 12)
+    for ranks in combinations_with_replacement(range(13), 3):
+        for r in range(13):
+            if win[hand_code(ranks + (r,))]:
+                outs[pack3(ranks)] |= 1 << r
+    return outs
+
+CLI_WIN = build(cli_rule)
+GUI_WIN = build(gui_rule)
+CLI_OUTS = build_outs(CLI_WIN)
+GUI_OUTS = build_outs(GUI_WIN)
+
+def outs(ranks, table=CLI_OUTS):
+    # rank mask that completes a 3-card hand; nothing for any other size
+    if len(ranks) != 3:
+        return 0
+    return table[pack3(sorted(ranks))]
+
+
+def disagreements():
+    """Returns every rank multiset on which the CLI and GUI rules differ."""
+    return [[RANKS[r] for r in ranks] for ranks in combinations_with_replacement(range(13), 4)
+            if CLI_WIN[pack(ranks)] != GUI_WIN[pack(ranks)]]
+
+
+if __name__ == '__main__':
+    # test_wintable.py checks both tables against the original predicates
+    print(f'{sum(CLI_WIN)} CLI wins, {sum(GUI_WIN)} GUI wins')
+    for hand in disagreements():
+        print(f"{' '.join(hand):<12} CLI {'win' if cli_rule([RANK_INDEX[r] for r in hand]) else 'no'}, GUI {'win' if gui_rule([RANK_INDEX[r] for r in hand]) else 'no'}")
@@ -0,0 +1,152 @@
+from streams import MASK64, mix
+
+"""
+64-bit Zobrist keys for game positions, and a transposition table.
+
+A position is the cards in every seat's hand, the top of the pot, the
+cards in the deck (as a collection, not their order) and the seat to move.
+Each (seat, card), pot top, deck card and seat to move has a fixed random
+64-bit key, and a position's key combines the keys of everything in it.
+Keys are added modulo 2**64 rather than xored, so that two copies of one
+card (a shoe of several decks) do not cancel out; a draw, discard or
+reshuffle changes a key with a few additions and subtractions.
+
+Hasher keeps the key of a game's current position up to date as the game
+tells it about draws, discards and reshuffles; position_key() computes
+one from scratch.
+TranspositionTable maps keys to whatever a search wants to remember, in a
+fixed number of two-way buckets; mcts keeps its tree's nodes in one. It
+may drop an entry for another, so it is a cache, not a way to count.
+"""
+
+MAX_SEATS = 64
+
+
+def _keys(salt, n):
+    return [mix((salt << 32 | i) * 0x9E3779B97F4A7C15 & MASK64) for i in range(n)]
+
+HAND = [_keys(1 + seat, 52) for seat in range(MAX_SEATS)]
+POT_TOP = _keys(1 << 16, 52)
+DECK = _keys(2 << 16, 52)
+SIDE = _keys(3 << 16, MAX_SEATS)
+
+
+def position_key(hands, pot_top, deck, side):
+    """The key of a position: card codes per seat, the pot top code or None, deck codes, seat to move."""
+    key = SIDE[side]
+    for seat, hand in enumerate(hands):
+        keys = HAND[seat]
+        for code in hand:
+            key += keys[code]
+    if pot_top is not None:
+        key += POT_TOP[pot_top]
+    for code in deck:
+        key += DECK[code]
+    return key & MASK64
+
+
+class Hasher:
+    """Keeps the key of a game's position as cards move; the game calls it at every change."""
+
+    def __init__(self, players, deck, side=0):
+        if players > MAX_SEATS:
+            raise ValueError(f'Zobrist keys cover at most {MAX_SEATS} seats')
+        self.players = players
+        self.deck = sum(DECK[card.code] for card in deck)
+        # the deck keys of the cards in the pot, for when they go back to the deck
+        self.pot = 0
+        self.top = None
+        self.hands = 0
+        self.side = side
+
+    @property
+    def key(self):
+        top = POT_TOP[self.top] if self.top is not None else 0
+        return (self.hands + self.deck + top + SIDE[self.side]) & MASK64
+
+    def deal(self, seat, cards):
+        keys = HAND[seat]
+        for card in cards:
+            self.hands += keys[card.code]
+            self.deck -= DECK[card.code]
+
+    def draw(self, seat, code):
+        self.hands += HAND[seat][code]
+        self.deck -= DECK[code]
+
+    def discard(self, seat, code):
+        self.hands -= HAND[seat][code]
+        self.pot += DECK[code]
+        self.top = code
+        self.side = (seat + 1) % self.players
+
+    def claim(self, seat, code):
+        # the pot top joins the hand it completes; it stays in the pot too, as in the engine
+        self.hands += HAND[seat][code]
+        self.side = seat
+
+    def reshuffle(self):
+        self.deck += self.pot
+        self.pot = 0
+        self.top = None
+
+
+class TranspositionTable:
+    """Maps position keys to values in buckets of two entries.
+
+    In every bucket, the first entry is only replaced by an entry searched
+    at least as deep, the second by whatever is stored last, so deep results
+    survive a stream of shallow ones and the table never grows.
+    """
+
+    def __init__(self, size=1 << 16):
+        if size & (size - 1):
+            raise ValueError('The table size must be a power of two')
+        self.mask = size - 1
+        self.keys = [None] * (2 * size)
+        self.values = [None] * (2 * size)
+        self.depths = [0] * (2 * size)
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.replaced = 0
+
+    def get(self, key, default=None):
+        self.probes += 1
+        slot = (key & self.mask) << 1
+        keys = self.keys
+        if keys[slot] == key:
+            self.hits += 1
+            return self.values[slot]
+        if keys[slot + 1] == key:
+            self.hits += 1
+            return self.values[slot + 1]
+        return default
+
+    def put(self, key, value, depth=0):
+        self.stores += 1
+        slot = (key & self.mask) << 1
+        keys = self.keys
+        if keys[slot] != key and keys[slot + 1] == key:
+            slot += 1
+        elif keys[slot] != key and keys[slot] is not None and depth < self.depths[slot]:
+            slot += 1
+        if keys[slot] is not None and keys[slot] != key:
+            self.replaced += 1
+        keys[slot] = key
+        self.values[slot] = value
+        self.depths[slot] = depth
+
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+    def stats(self):
+        used = sum(key is not None for key in self.keys)
+        return {'probes': self.probes, 'hits': self.hits, 'hit_rate': self.hit_rate(),
+                'stores': self.stores, 'replaced': self.replaced,
+                'used': used, 'capacity': len(self.keys)}
+
+    def clear(self):
+        self.keys = [None] * len(self.keys)
+        self.values = [None] * len(self.values)
+        self.depths = [0] * len(self.depths)